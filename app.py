@@ -1,24 +1,100 @@
 import os
-from flask import Flask, request, render_template_string, session
+import json
+import hashlib
+import logging
+import secrets
+from flask import Flask, request, session, jsonify, redirect, Response, stream_with_context
 from dotenv import load_dotenv
-from enhanced_chatbot import EnhancedNikeChatbot
 
-# Load environment variables
+# Load environment variables before the modules below read their settings
 load_dotenv()
 
+from conversation_store import create_conversation_store
+from enhanced_chatbot import EnhancedNikeChatbot
+from knowledge_base import KNOWLEDGE_BASE_PATH, KnowledgeBaseWatcher, load_knowledge_base
+from metrics import CallbackMetric, registry
+from nlp_resources import nlp_resources
+
+# Leveled logging; per-query lines are DEBUG and sampled at LOG_SAMPLE_RATE
+logging.basicConfig(
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+)
+
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your-secret-key-here')
 
+# Static assets are fingerprinted below, so browsers may cache them for a year
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 365 * 24 * 60 * 60
+
 # Initialize chatbot
 openai_api_key = os.getenv('OPENAI_API_KEY')
 if not openai_api_key:
     print("Warning: OPENAI_API_KEY not found in environment variables")
     openai_api_key = 'your-openai-api-key-here'
 
-chatbot = EnhancedNikeChatbot(openai_api_key)
+# Largest {"queries": [...]} batch accepted by /api/chat
+API_MAX_BATCH = int(os.getenv('API_MAX_BATCH', '1000'))
+
+# Load NLTK data before serving so no request pays for it; fail fast if it is missing
+nlp_warmup = nlp_resources.warmup(
+    mode=os.getenv('NLP_MODE', 'nltk'),
+    strict=os.getenv('NLP_STRICT_RESOURCES', '1') != '0'
+)
+print(f"✓ NLP resources loaded in {nlp_warmup * 1000:.0f}ms")
+
+# Knowledge base from KNOWLEDGE_BASE_PATH (JSON or YAML), or the built-in data
+knowledge = load_knowledge_base(KNOWLEDGE_BASE_PATH)
+
+chatbot = EnhancedNikeChatbot(
+    openai_api_key,
+    knowledge=knowledge,
+    cache_size=int(os.getenv('RESPONSE_CACHE_SIZE', '1024')),
+    cache_ttl=float(os.getenv('RESPONSE_CACHE_TTL', '3600')),
+    openai_timeout=float(os.getenv('OPENAI_TIMEOUT', '8')),
+    spell_correction=os.getenv('NLP_SPELL_CORRECTION', '1') != '0'
+)
+
+# Chat history lives server-side; the session cookie only carries an id
+conversation_store = create_conversation_store()
+
+# Seconds between background refits of the intent classifier (0 disables); a refit
+# only runs when examples were added with add_examples() since the last one
+INTENT_REFIT_INTERVAL = float(os.getenv('INTENT_REFIT_INTERVAL', '3600'))
+
+# Seconds between checks of the knowledge base file's mtime (0 disables hot reload)
+KNOWLEDGE_RELOAD_INTERVAL = float(os.getenv('KNOWLEDGE_RELOAD_INTERVAL', '5'))
+
+knowledge_watcher = None
+if KNOWLEDGE_BASE_PATH and KNOWLEDGE_RELOAD_INTERVAL > 0:
+    knowledge_watcher = KnowledgeBaseWatcher(
+        KNOWLEDGE_BASE_PATH,
+        chatbot.apply_knowledge,
+        interval=KNOWLEDGE_RELOAD_INTERVAL,
+        mtime=knowledge.mtime
+    )
+
+def start_background_tasks():
+    """Start this process's background threads; call after forking, threads do not survive it"""
+    if INTENT_REFIT_INTERVAL > 0:
+        chatbot.classifier.start_background_refit(INTENT_REFIT_INTERVAL)
+    if knowledge_watcher is not None:
+        knowledge_watcher.start()
+
+def get_session_id():
+    """Return this browser's conversation id, assigning one on first visit"""
+    if 'sid' not in session:
+        session['sid'] = secrets.token_urlsafe(16)
+    return session['sid']
 
-# HTML template with embedded CSS and JavaScript
+def static_url(filename):
+    """URL for a static file with a content hash, so edits bust the browser cache"""
+    with open(os.path.join(app.static_folder, filename), 'rb') as f:
+        version = hashlib.sha1(f.read()).hexdigest()[:12]
+    return f"{app.static_url_path}/{filename}?v={version}"
+
+# HTML template; CSS and JavaScript are served from static/ with ETags
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="en">
@@ -26,183 +102,7 @@ HTML_TEMPLATE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Nike Customer Support Chatbot</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            padding: 20px;
-        }
-        
-        .container {
-            background: white;
-            border-radius: 20px;
-            box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-            max-width: 800px;
-            width: 100%;
-            overflow: hidden;
-            height: 80vh;
-            display: flex;
-            flex-direction: column;
-        }
-        
-        .header {
-            background: linear-gradient(135deg, #ff6b6b 0%, #ee5a52 100%);
-            color: white;
-            padding: 30px;
-            text-align: center;
-            position: relative;
-        }
-        
-        .header h1 {
-            font-size: 2.5em;
-            margin-bottom: 10px;
-            position: relative;
-            z-index: 1;
-        }
-        
-        .header p {
-            font-size: 1.2em;
-            opacity: 0.9;
-            position: relative;
-            z-index: 1;
-        }
-        
-        .chat-container {
-            flex: 1;
-            overflow-y: auto;
-            padding: 30px;
-            background: #f8f9fa;
-            border-bottom: 1px solid #e9ecef;
-        }
-        
-        .message {
-            margin-bottom: 20px;
-            padding: 15px 20px;
-            border-radius: 15px;
-            max-width: 80%;
-            line-height: 1.6;
-            box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-        }
-        
-        .user-message {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            margin-left: auto;
-            border-bottom-right-radius: 5px;
-        }
-        
-        .bot-message {
-            background: white;
-            color: #333;
-            border: 1px solid #e9ecef;
-            border-bottom-left-radius: 5px;
-        }
-        
-        .input-container {
-            padding: 30px;
-            background: white;
-        }
-        
-        .input-form {
-            display: flex;
-            gap: 15px;
-            align-items: center;
-        }
-        
-        .input-field {
-            flex: 1;
-            padding: 15px 20px;
-            border: 2px solid #e9ecef;
-            border-radius: 25px;
-            font-size: 16px;
-            outline: none;
-            transition: all 0.3s ease;
-        }
-        
-        .input-field:focus {
-            border-color: #667eea;
-            box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-        }
-        
-        .send-button {
-            padding: 15px 25px;
-            background: linear-gradient(135deg, #ff6b6b 0%, #ee5a52 100%);
-            color: white;
-            border: none;
-            border-radius: 25px;
-            font-size: 16px;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            min-width: 80px;
-        }
-        
-        .send-button:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 5px 15px rgba(255, 107, 107, 0.3);
-        }
-        
-        .welcome-message {
-            text-align: center;
-            padding: 40px 20px;
-            color: #666;
-            font-size: 1.1em;
-        }
-        
-        .welcome-message h3 {
-            margin-bottom: 15px;
-            color: #333;
-        }
-        
-        .feature-list {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 15px;
-            margin-top: 20px;
-        }
-        
-        .feature-item {
-            background: white;
-            padding: 15px;
-            border-radius: 10px;
-            text-align: center;
-            box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-        }
-        
-        .feature-item strong {
-            color: #ff6b6b;
-            display: block;
-            margin-bottom: 5px;
-        }
-        
-        @media (max-width: 600px) {
-            .header h1 {
-                font-size: 2em;
-            }
-            
-            .input-form {
-                flex-direction: column;
-            }
-            
-            .input-field, .send-button {
-                width: 100%;
-            }
-            
-            .container {
-                height: 90vh;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ css_url }}">
 </head>
 <body>
     <div class="container">
@@ -253,40 +153,27 @@ HTML_TEMPLATE = """
         </div>
     </div>
     
-    <script>
-        // Auto-scroll to bottom of chat
-        function scrollToBottom() {
-            const chatContainer = document.getElementById('chatContainer');
-            chatContainer.scrollTop = chatContainer.scrollHeight;
-        }
-        
-        // Focus on input field
-        document.getElementById('messageInput').focus();
-        
-        // Scroll to bottom on page load
-        scrollToBottom();
-        
-        // Handle form submission
-        document.getElementById('chatForm').addEventListener('submit', function() {
-            setTimeout(scrollToBottom, 100);
-        });
-    </script>
+    <script src="{{ js_url }}" defer></script>
 </body>
 </html>
 """
 
+# Compiled once at startup; each request only renders the message list
+CHAT_PAGE = app.jinja_env.from_string(HTML_TEMPLATE, globals={
+    'css_url': static_url('css/chat.css'),
+    'js_url': static_url('js/chat.js')
+})
+
 @app.route('/', methods=['GET', 'POST'])
 def chat():
-    # Initialize session messages if not exists
-    if 'messages' not in session:
-        session['messages'] = []
+    session_id = get_session_id()
     
     if request.method == 'POST':
         user_message = request.form.get('message', '').strip()
         
         if user_message:
-            # Add user message to session
-            session['messages'].append({
+            # Add user message to the conversation
+            conversation_store.append(session_id, {
                 'type': 'user',
                 'content': user_message
             })
@@ -294,25 +181,92 @@ def chat():
             # Get bot response
             bot_response = chatbot.process_query(user_message)
             
-            # Add bot response to session
-            session['messages'].append({
+            # Add bot response to the conversation
+            conversation_store.append(session_id, {
                 'type': 'bot',
                 'content': bot_response
             })
-            
-            # Keep only last 20 messages to prevent session overflow
-            if len(session['messages']) > 20:
-                session['messages'] = session['messages'][-20:]
-            
-            session.modified = True
     
-    return render_template_string(HTML_TEMPLATE, messages=session['messages'])
+    return CHAT_PAGE.render(messages=conversation_store.get(session_id))
+
+@app.route('/api/chat', methods=['POST'])
+def api_chat():
+    """JSON chat API: {"query": "..."} or {"queries": [...]}, no session or page render"""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object body'}), 400
+    
+    if 'queries' in payload:
+        queries = payload['queries']
+        if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+            return jsonify({'error': "'queries' must be a list of strings"}), 400
+        if len(queries) > API_MAX_BATCH:
+            return jsonify({'error': f"At most {API_MAX_BATCH} queries per batch"}), 413
+        return jsonify({'results': chatbot.answer_batch(queries)})
+    
+    query = payload.get('query')
+    if not isinstance(query, str):
+        return jsonify({'error': "'query' must be a string"}), 400
+    return jsonify(chatbot.answer(query))
+
+@app.route('/chat/stream')
+def chat_stream():
+    """Stream the reply to ?message= as server-sent events"""
+    user_message = request.args.get('message', '').strip()
+    session_id = get_session_id()
+    
+    def generate():
+        chunks = []
+        try:
+            for chunk in chatbot.stream_query(user_message):
+                chunks.append(chunk)
+                yield f"data: {json.dumps({'text': chunk})}\n\n"
+        finally:
+            # Saved only once a reply was produced: if the stream fails before its first
+            # event, chat.js posts the form instead and the POST handler saves the turn.
+            # The store is server-side, so this works after the headers went out
+            if user_message and chunks:
+                conversation_store.append(session_id, {'type': 'user', 'content': user_message})
+                conversation_store.append(session_id, {'type': 'bot', 'content': "".join(chunks)})
+        yield "event: done\ndata: {}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/cache/stats')
+def cache_stats():
+    """Response cache hit/miss counters"""
+    return jsonify(chatbot.get_cache_stats())
+
+def cache_samples(field):
+    """One sample per cache for a field of LRUCache.stats()"""
+    stats = chatbot.get_cache_stats()
+    caches = {"responses": stats["responses"], "nlp_lemmas": stats["nlp"]["lemmas"], "nlp_queries": stats["nlp"]["queries"]}
+    return {(name,): cache[field] for name, cache in caches.items()}
+
+for field, kind, documentation in [
+    ("hits", "counter", "Cache lookups that hit"),
+    ("misses", "counter", "Cache lookups that missed"),
+    ("evictions", "counter", "Entries evicted to stay under maxsize"),
+    ("size", "gauge", "Entries currently cached")
+]:
+    name = f"chatbot_cache_{field}" + ("_total" if kind == "counter" else "")
+    registry.register(CallbackMetric(name, documentation, kind, ["cache"], lambda field=field: cache_samples(field)))
+
+@app.route('/metrics')
+def metrics():
+    """Per-stage latency histograms and request counters in the Prometheus text format"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/clear')
 def clear_chat():
     """Clear chat history"""
-    session['messages'] = []
+    conversation_store.clear(get_session_id())
     return redirect('/')
 
 if __name__ == '__main__':
+    start_background_tasks()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark predict_intents against a loop of predict_intent and check parity
+Every intent engine configuration (knn index modes, vectorizers, linear, and the
+embedding engine in float32 and int8) must give the same intent for every query
+in both paths, with scores equal up to float32 rounding for the embedding engine
+"""
+
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Time the uncached pipeline, and never touch the real model artifact
+os.environ['NLP_LEMMA_CACHE_SIZE'] = '0'
+os.environ['NLP_QUERY_CACHE_SIZE'] = '0'
+os.environ['INTENT_MODEL_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench-model-'), 'intent_classifier.joblib')
+
+from ml_trainer import IntentClassifier, LinearIntentClassifier
+from training_data import TRAINING_DATA, NEGATIVE_EXAMPLES
+
+# Score tolerance per engine: sparse TF-IDF products are exact, float32 embeddings are not
+EXACT = 1e-12
+FLOAT32 = 1e-5
+
+def configurations():
+    """(name, engine factory, score tolerance) for every engine setting the batch path supports"""
+    from embedding_engine import EmbeddingIntentClassifier
+    configs = []
+    for vectorizer in ('tfidf', 'hashing'):
+        for index_mode in ('exhaustive', 'centroid', 'prototype'):
+            configs.append((f"knn/{index_mode}/{vectorizer}",
+                            lambda m=index_mode, v=vectorizer: IntentClassifier(index_mode=m, vectorizer=v), EXACT))
+        configs.append((f"linear/{vectorizer}", lambda v=vectorizer: LinearIntentClassifier(vectorizer=v), EXACT))
+    for quantize in ('float32', 'int8'):
+        configs.append((f"embedding/{quantize}", lambda q=quantize: EmbeddingIntentClassifier(quantize=q), FLOAT32))
+    return configs
+
+def corpus(extra=300, seed=0):
+    """Training and negative queries plus shuffled word mixes of them"""
+    queries = [example["query"] for example in TRAINING_DATA + NEGATIVE_EXAMPLES]
+    words = " ".join(queries).split()
+    rng = random.Random(seed)
+    queries += [" ".join(rng.sample(words, rng.randint(1, 8))) for _ in range(extra)]
+    return queries + ["", "the", "zzzz qqqq"]
+
+def check_parity(engine, queries, tolerance):
+    """Queries whose batch intent or score differs from predict_intent"""
+    intents, scores = engine.predict_intents(queries)
+    mismatches = []
+    for query, intent, score in zip(queries, intents, scores):
+        expected_intent, expected_score = engine.predict_intent(query)
+        if intent != expected_intent or abs(score - expected_score) > tolerance:
+            mismatches.append((query, (expected_intent, float(expected_score)), (intent, float(score))))
+    return mismatches
+
+def main():
+    queries = corpus()
+    failed = False
+    print(f"{len(queries)} queries")
+    print(f"  {'engine':<24} {'parity':>9} {'loop ms':>9} {'batch ms':>9} {'speedup':>8}")
+    for name, factory, tolerance in configurations():
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine = factory()
+            engine.fit()
+
+        mismatches = check_parity(engine, queries, tolerance)
+        failed = failed or bool(mismatches)
+
+        start = time.perf_counter()
+        for query in queries:
+            engine.predict_intent(query)
+        loop = time.perf_counter() - start
+        start = time.perf_counter()
+        engine.predict_intents(queries)
+        batch = time.perf_counter() - start
+
+        print(f"  {name:<24} {len(queries) - len(mismatches):>4}/{len(queries):<4} "
+              f"{loop * 1000:>9.1f} {batch * 1000:>9.1f} {loop / batch:>7.1f}x")
+        for query, expected, got in mismatches[:5]:
+            print(f"    {query!r}: predict_intent {expected} != predict_intents {got}")
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark NikeChatbot.find_best_match against the original nested-loop scan
+Checks that the keyword index returns identical categories and scores
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import FAQ_DATA
+from matchers import FAQKeywordIndex
+from nlp_processor import NLPProcessor
+from training_data import TRAINING_DATA, NEGATIVE_EXAMPLES
+
+def legacy_find_best_match(processed_query):
+    """Original implementation: categories x tokens x keywords substring scan"""
+    query_tokens, original_query = processed_query
+    best_match = None
+    best_score = 0
+    
+    for category, data in FAQ_DATA.items():
+        keyword_matches = 0
+        for token in query_tokens:
+            for keyword in data['keywords']:
+                if token.lower() in keyword.lower() or keyword.lower() in token.lower():
+                    keyword_matches += 1
+                    break
+        
+        if len(query_tokens) > 0:
+            score = keyword_matches / len(query_tokens)
+        else:
+            score = 0
+        
+        for keyword in data['keywords']:
+            if keyword.lower() in original_query.lower():
+                score += 0.3
+        
+        if score > best_score:
+            best_score = score
+            best_match = category
+    
+    return best_match, best_score
+
+def build_corpus(nlp, extra=300, seed=0):
+    """TRAINING_DATA queries plus shuffled word mixes of them"""
+    queries = [example["query"] for example in TRAINING_DATA + NEGATIVE_EXAMPLES]
+    words = " ".join(queries).split()
+    rng = random.Random(seed)
+    queries += [" ".join(rng.sample(words, rng.randint(1, 8))) for _ in range(extra)]
+    return [nlp.process_query(query) for query in queries]
+
+def time_all(func, corpus, repeat=20):
+    """Average seconds per query over the corpus"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for processed_query in corpus:
+            func(processed_query)
+    return (time.perf_counter() - start) / (repeat * len(corpus))
+
+def main():
+    nlp = NLPProcessor()
+    index = FAQKeywordIndex(FAQ_DATA)
+    corpus = build_corpus(nlp)
+    
+    def indexed(processed_query):
+        return index.best_match(*processed_query)
+    
+    mismatches = [pq for pq in corpus if legacy_find_best_match(pq) != indexed(pq)]
+    print(f"Parity: {len(corpus) - len(mismatches)}/{len(corpus)} queries give identical category and score")
+    if mismatches:
+        for pq in mismatches[:5]:
+            print(f"  {pq}: {legacy_find_best_match(pq)} != {indexed(pq)}")
+        sys.exit(1)
+    
+    legacy = time_all(legacy_find_best_match, corpus)
+    fast = time_all(indexed, corpus)
+    print(f"legacy scan: {legacy * 1e6:.1f} us/query")
+    print(f"keyword index: {fast * 1e6:.1f} us/query ({legacy / fast:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark chat history in the signed session cookie vs. a server-side store
+Reports request bytes (cookie header) and per-request latency of a chat POST
+against the length of the conversation
+"""
+
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, request, render_template_string, session
+from conversation_store import InMemoryConversationStore, SQLiteConversationStore
+from data import FAQ_DATA, NIKE_PRODUCTS
+
+HISTORY_LENGTHS = [0, 4, 10, 20]
+REQUESTS = 200
+
+def product_answer(name):
+    """The long markdown product answers that filled up the cookie"""
+    product = NIKE_PRODUCTS[name]
+    return (f"**{name}**\n\n{product['description']}\n\n"
+            f"💰 **Price:** {product['price']}\n📏 **Sizes:** {product['sizes']}\n"
+            f"🎨 **Colors:** {product['colors']}\n\n"
+            "Would you like more information about this product or help with sizing?")
+
+# Distinct answers cycled through the conversation so the cookie's zlib compression
+# sees realistic text instead of one repeated string
+BOT_ANSWERS = [product_answer(name) for name in NIKE_PRODUCTS]
+BOT_ANSWERS += [f"**Nike Customer Support:** {response}"
+                for data in FAQ_DATA.values() for response in data['responses']]
+
+def bot_answer(message):
+    """Pick a stable answer for a message"""
+    return BOT_ANSWERS[sum(map(ord, message)) % len(BOT_ANSWERS)]
+
+TEMPLATE = "{% for message in messages %}<div>{{ message.content | safe }}</div>{% endfor %}"
+
+def cookie_app(max_messages):
+    """The original route: the whole history re-serialized into the cookie"""
+    app = Flask(__name__)
+    app.secret_key = 'benchmark'
+    
+    @app.route('/', methods=['POST'])
+    def chat():
+        if 'messages' not in session:
+            session['messages'] = []
+        session['messages'].append({'type': 'user', 'content': request.form['message']})
+        session['messages'].append({'type': 'bot', 'content': bot_answer(request.form['message'])})
+        if len(session['messages']) > max_messages:
+            session['messages'] = session['messages'][-max_messages:]
+        session.modified = True
+        return render_template_string(TEMPLATE, messages=session['messages'])
+    
+    return app
+
+def store_app(store):
+    """The current route: only a session id in the cookie, messages appended to the store"""
+    app = Flask(__name__)
+    app.secret_key = 'benchmark'
+    
+    @app.route('/', methods=['POST'])
+    def chat():
+        if 'sid' not in session:
+            session['sid'] = secrets.token_urlsafe(16)
+        store.append(session['sid'], {'type': 'user', 'content': request.form['message']})
+        store.append(session['sid'], {'type': 'bot', 'content': bot_answer(request.form['message'])})
+        return render_template_string(TEMPLATE, messages=store.get(session['sid']))
+    
+    return app
+
+def measure(app, history_length):
+    """Cookie bytes sent with the next request and mean POST latency at a given history length"""
+    client = app.test_client()
+    for i in range(history_length // 2):
+        client.post('/', data={'message': f"warm-up question {i}"})
+    
+    cookie = client.get_cookie('session')
+    cookie_bytes = len(cookie.value) if cookie else 0
+    
+    # Re-post from the same conversation state each time so the history length stays fixed
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        with app.test_client() as fresh:
+            if cookie:
+                fresh.set_cookie('session', cookie.value)
+            fresh.post('/', data={'message': "What size should I get?"})
+    latency = (time.perf_counter() - start) / REQUESTS
+    return cookie_bytes, latency
+
+def main():
+    max_messages = max(HISTORY_LENGTHS) + 2
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ("cookie", lambda: cookie_app(max_messages)),
+            ("memory", lambda: store_app(InMemoryConversationStore(max_messages=max_messages))),
+            ("sqlite", lambda: store_app(SQLiteConversationStore(
+                os.path.join(tmp, f"bench-{secrets.token_hex(4)}.db"), max_messages=max_messages)))
+        ]
+        
+        print(f"{'messages':>8} {'backend':>8} {'cookie bytes':>13} {'ms/request':>11}")
+        for history_length in HISTORY_LENGTHS:
+            for name, build in backends:
+                cookie_bytes, latency = measure(build(), history_length)
+                note = "  (over the ~4KB browser cookie limit)" if cookie_bytes > 4093 else ""
+                print(f"{history_length:>8} {name:>8} {cookie_bytes:>13} {latency * 1000:>11.3f}{note}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Intent engine benchmark: kNN similarity vs. the linear model vs. dense embeddings
+Fits each engine on the training set scaled 1x/10x/100x/1000x and replays the
+seeded synthetic corpus from bench_query_path. Reports fit time, per-query
+scoring latency (queries that miss the regex patterns, i.e. reach the engine),
+batch throughput, the size of the arrays each query is scored against, and how
+often each engine agrees with the exhaustive kNN answer. The score column times
+only the engine's scoring step on already-vectorized queries, without the
+TF-IDF transform that every engine shares. For the embedding engines, ANN
+recall is how often the IVF index's answer matches an exhaustive search of the
+same stored vectors. The scaled training sets are mostly exact duplicates,
+which the index stores once, so the IVF sweep also builds an index over
+distinct "<training query> <product name>" vectors and reports, per n_probe,
+single-query latency and how often the exact nearest score is found
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+import bench_query_path
+from bench_query_path import RESULTS_DIR, git_commit, synthetic_corpus, time_stage
+
+ENGINE_NAMES = ["knn", "knn-centroid", "linear", "embedding", "embedding-int8"]
+PROBE_SWEEP = [1, 4, 8, 16, 32]
+
+def new_engine(name):
+    from embedding_engine import EmbeddingIntentClassifier
+    from ml_trainer import IntentClassifier, LinearIntentClassifier
+    if name == "knn":
+        return IntentClassifier()
+    if name == "knn-centroid":
+        return IntentClassifier(index_mode='centroid')
+    if name == "linear":
+        return LinearIntentClassifier()
+    return EmbeddingIntentClassifier(quantize='int8' if name == "embedding-int8" else 'float32')
+
+def index_bytes(engine, model):
+    """Bytes of the arrays one query is scored against"""
+    if engine.engine == 'knn' and engine.index_mode == 'exhaustive':
+        vectors = model.training_vectors
+        return vectors.data.nbytes + vectors.indices.nbytes + vectors.indptr.nbytes
+    if model.index is not None:
+        return model.index.nbytes
+    return model.index_vectors.nbytes + (model.index_bias.nbytes if model.index_bias is not None else 0)
+
+def ivf_sweep(engine, model, knowledge, query_vectors, rng, args):
+    """IVF build time, latency and recall per n_probe over distinct example + product vectors"""
+    from embedding_engine import IVFIndex
+    product_names = list(knowledge.products)
+    texts = [f"{example['query']} {rng.choice(product_names)}" for example in knowledge.training_data]
+    vectors = model.vectorizer.transform([engine._query_text(engine.nlp.process_query(text)[0], text)
+                                          for text in texts])
+    labels = [example["intent"] for example in knowledge.training_data]
+
+    start = time.perf_counter()
+    index = IVFIndex(vectors, labels, quantize=engine.quantize)
+    build_seconds = time.perf_counter() - start
+
+    exact = copy.copy(index)
+    exact.n_probe = len(index.centroids)
+    exact_scores = exact.search(query_vectors)[1]
+    sweep = {}
+    for n_probe in [p for p in PROBE_SWEEP if p < len(index.centroids)] + [len(index.centroids)]:
+        probed = copy.copy(index)
+        probed.n_probe = n_probe
+        latency = time_stage(lambda vector: probed.search(vector[None, :]), query_vectors, args.warmup)
+        recall = float(np.mean(probed.search(query_vectors)[1] >= exact_scores - 1e-6))
+        sweep[n_probe] = {"p50_ms": latency["p50_ms"], "p99_ms": latency["p99_ms"], "recall": recall}
+    return {"vectors": len(index), "lists": len(index.centroids), "build_seconds": build_seconds,
+            "index_bytes": index.nbytes, "probes": sweep}
+
+def run_scale(factor, args):
+    rng = random.Random(args.seed)
+    knowledge = bench_query_path.scale_knowledge(factor, rng)
+    corpus = synthetic_corpus(knowledge, args.queries, random.Random(args.seed))
+
+    result = {"scale": factor, "training_examples": len(knowledge.training_data), "engines": {}}
+    baseline = None
+    for name in args.engines:
+        engine = new_engine(name)
+        start = time.perf_counter()
+        model = engine.fit(knowledge.training_data, knowledge.intent_patterns)
+        fit_seconds = time.perf_counter() - start
+
+        processed = [engine.nlp.process_query(query) for query in corpus]
+        scored = [item for item in processed if not model.pattern_matcher.match(item[1].lower())]
+        latency = time_stage(lambda item: engine.predict_processed(*item), scored, args.warmup)
+        vectors = [model.vectorizer.transform([" ".join(tokens)]) for tokens, _ in scored]
+        score_latency = time_stage(lambda vector: engine._score(model, vector, 0.3), vectors, args.warmup)
+
+        start = time.perf_counter()
+        intents, _ = engine.predict_processed_batch(processed)
+        batch_seconds = time.perf_counter() - start
+
+        recall = sweep = None
+        if model.index is not None and vectors:
+            exhaustive = copy.copy(model.index)
+            exhaustive.n_probe = len(exhaustive.centroids)
+            query_vectors = np.vstack([vector[0] for vector in vectors])
+            recall = sum(a == b for a, b in zip(model.index.search(query_vectors)[0],
+                                                exhaustive.search(query_vectors)[0])) / len(vectors)
+            sweep = ivf_sweep(engine, model, knowledge, query_vectors, random.Random(args.seed), args)
+
+        intents = list(intents)
+        if baseline is None:
+            baseline = intents
+        result["engines"][name] = dict(
+            latency,
+            fit_seconds=fit_seconds,
+            score_p50_ms=score_latency["p50_ms"],
+            score_p99_ms=score_latency["p99_ms"],
+            batch_qps=len(processed) / batch_seconds,
+            index_bytes=index_bytes(engine, model),
+            agreement=sum(a == b for a, b in zip(intents, baseline)) / len(intents),
+            ann_recall=recall,
+            ivf_sweep=sweep
+        )
+    return result
+
+def print_result(result):
+    print(f"\nscale {result['scale']}x: {result['training_examples']} training examples")
+    print(f"  {'engine':<14} {'fit s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'score p50':>10} {'score p99':>10} {'batch q/s':>10} {'index KiB':>10} {'agree':>6} {'ANN recall':>10}")
+    for name, engine in result["engines"].items():
+        print(f"  {name:<14} {engine['fit_seconds']:>8.2f} {engine['p50_ms']:>8.3f} {engine['p95_ms']:>8.3f} "
+              f"{engine['p99_ms']:>8.3f} {engine['score_p50_ms']:>10.3f} {engine['score_p99_ms']:>10.3f} "
+              f"{engine['batch_qps']:>10.0f} {engine['index_bytes'] / 1024:>10.1f} {engine['agreement']:>6.3f} "
+              f"{'' if engine['ann_recall'] is None else format(engine['ann_recall'], '.3f'):>10}")
+
+    for name, engine in result["engines"].items():
+        sweep = engine["ivf_sweep"]
+        if sweep is None:
+            continue
+        print(f"  {name} IVF sweep: {sweep['vectors']} distinct vectors, {sweep['lists']} lists, "
+              f"build {sweep['build_seconds']:.2f}s, {sweep['index_bytes'] / 1024:.1f} KiB")
+        print(f"    {'n_probe':>8} {'p50 ms':>8} {'p99 ms':>8} {'recall':>8}")
+        for n_probe, probe in sweep["probes"].items():
+            print(f"    {n_probe:>8} {probe['p50_ms']:>8.3f} {probe['p99_ms']:>8.3f} {probe['recall']:>8.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=bench_query_path.DEFAULT_SCALES)
+    parser.add_argument('--engines', nargs='+', default=ENGINE_NAMES, choices=ENGINE_NAMES,
+                        help="agreement is measured against the first engine listed")
+    parser.add_argument('--queries', type=int, default=2000, help="synthetic corpus size")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--output', help="JSON results path (default benchmarks/results/intent_engines-<time>.json)")
+    args = parser.parse_args()
+
+    # Measure the engines, not the NLP memo caches, and never touch the real model artifact
+    os.environ['NLP_LEMMA_CACHE_SIZE'] = '0'
+    os.environ['NLP_QUERY_CACHE_SIZE'] = '0'
+    os.environ['INTENT_MODEL_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench-model-'), 'intent_classifier.joblib')
+    bench_query_path.import_repo()
+
+    results = {
+        "benchmark": "intent_engines",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "settings": {
+            "nlp_mode": os.getenv('NLP_MODE', 'nltk'),
+            **{key: value for key, value in vars(args).items() if key != 'output'}
+        },
+        "scales": []
+    }
+    for factor in args.scales:
+        result = run_scale(factor, args)
+        print_result(result)
+        results["scales"].append(result)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("intent_engines-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {output}")
+
+if __name__ == '__main__':
+    main()
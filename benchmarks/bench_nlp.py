@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark NLPProcessor modes and check fast-mode parity with the NLTK path
+Compares tokens and cleaned text for every TRAINING_DATA query (plus FAQ
+keywords and negative examples) and reports per-query latency
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import FAQ_DATA
+from nlp_processor import NLPProcessor
+from training_data import TRAINING_DATA, NEGATIVE_EXAMPLES
+
+REPEAT = 50
+
+def corpus():
+    """Queries to compare and time"""
+    queries = [example["query"] for example in TRAINING_DATA + NEGATIVE_EXAMPLES]
+    queries += [keyword for data in FAQ_DATA.values() for keyword in data['keywords']]
+    queries += ["I cannot find my size, gonna return them!!", "wanna   exchange... Air-Max 270s?", ""]
+    return queries
+
+def time_mode(processor, queries):
+    """Mean seconds per query"""
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for query in queries:
+            processor.process_query(query)
+    return (time.perf_counter() - start) / (REPEAT * len(queries))
+
+def main():
+    queries = corpus()
+    
+    start = time.perf_counter()
+    nltk_processor = NLPProcessor(mode='nltk')
+    nltk_first = nltk_processor.process_query("What sizes do you have?")
+    nltk_startup = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    fast_processor = NLPProcessor(mode='fast')
+    fast_startup = time.perf_counter() - start
+    
+    mismatches = [(query, nltk_processor.process_query(query), fast_processor.process_query(query))
+                  for query in queries
+                  if nltk_processor.process_query(query) != fast_processor.process_query(query)]
+    print(f"Parity: {len(queries) - len(mismatches)}/{len(queries)} queries give identical tokens and cleaned text")
+    for query, expected, actual in mismatches[:5]:
+        print(f"  {query!r}: nltk={expected} fast={actual}")
+    
+    nltk_latency = time_mode(nltk_processor, queries)
+    fast_latency = time_mode(fast_processor, queries)
+    print(f"startup + first query: nltk {nltk_startup * 1000:.1f} ms, fast {fast_startup * 1000:.1f} ms (table build)")
+    print(f"per query: nltk {nltk_latency * 1e6:.1f} us, fast {fast_latency * 1e6:.1f} us ({nltk_latency / fast_latency:.1f}x)")
+    print(f"lemma table: {len(fast_processor.lemma_table)} words")
+    
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
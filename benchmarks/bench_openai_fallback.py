@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Exercise the OpenAI fallback client against the local stub server
+Shows request coalescing for identical concurrent questions and the
+deadline degrading to the rule-based fallback answer
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openai_client import OpenAIFallbackClient
+from openai_stub import STUB_ANSWER, start_stub_server
+
+CONCURRENCY = 32
+
+def coalescing(delay=0.3):
+    """Identical concurrent questions should cost one upstream call"""
+    server, api_base = start_stub_server(delay=delay)
+    client = OpenAIFallbackClient("stub-key", api_base=api_base, timeout=5.0)
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        answers = list(pool.map(client.ask, ["What is your return policy?"] * CONCURRENCY))
+    elapsed = time.perf_counter() - start
+    
+    assert all(answer == STUB_ANSWER for answer in answers)
+    print(f"{CONCURRENCY} identical questions: {server.request_count} upstream call(s) in {elapsed:.2f}s")
+    
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        list(pool.map(client.ask, [f"Question number {i}" for i in range(CONCURRENCY)]))
+    print(f"{CONCURRENCY} distinct questions: {server.request_count - 1} upstream calls")
+    server.shutdown()
+
+def deadline(delay=2.0, budget=0.25):
+    """A slow upstream should give up at the deadline"""
+    server, api_base = start_stub_server(delay=delay)
+    client = OpenAIFallbackClient("stub-key", api_base=api_base, timeout=budget)
+    
+    start = time.perf_counter()
+    answer = client.ask("Will this answer arrive in time?")
+    elapsed = time.perf_counter() - start
+    
+    assert answer is None
+    print(f"upstream delay {delay:.1f}s, deadline {budget:.2f}s: gave up after {elapsed:.2f}s")
+    server.shutdown()
+
+def main():
+    coalescing()
+    deadline()
+
+if __name__ == '__main__':
+    main()
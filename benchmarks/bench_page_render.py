@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark the chat page render of the / route
+Before: render_template_string over the full template with inline CSS and
+JavaScript on every request. After: the template compiled once at startup,
+with CSS and JavaScript served from static/
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import render_template_string
+import app as chat_app
+
+HISTORY_LENGTHS = [0, 10, 20]
+REQUESTS = 300
+
+def inline_template():
+    """Rebuild the original single-string template with the assets embedded"""
+    static = chat_app.app.static_folder
+    with open(os.path.join(static, 'css', 'chat.css')) as f:
+        css = f.read()
+    with open(os.path.join(static, 'js', 'chat.js')) as f:
+        js = f.read()
+    
+    template = chat_app.HTML_TEMPLATE
+    template = template.replace('<link rel="stylesheet" href="{{ css_url }}">', f"<style>\n{css}</style>")
+    return template.replace('<script src="{{ js_url }}" defer></script>', f"<script>\n{js}</script>")
+
+def make_messages(count):
+    """Alternating user and bot messages"""
+    answer = chat_app.chatbot.format_product_response("Dunk Low", chat_app.chatbot.product_matcher.products["Dunk Low"])
+    return [{'type': 'user' if i % 2 == 0 else 'bot', 'content': f"Question {i}" if i % 2 == 0 else answer}
+            for i in range(count)]
+
+def time_route(client, path):
+    """Mean latency and body size of GET path"""
+    size = len(client.get(path).data)
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        client.get(path)
+    return (time.perf_counter() - start) / REQUESTS, size
+
+def main():
+    flask_app = chat_app.app
+    legacy_template = inline_template()
+    
+    # The original render, registered on a side route of the same app
+    state = {'messages': []}
+    
+    @flask_app.route('/__bench_legacy')
+    def legacy_page():
+        return render_template_string(legacy_template, messages=state['messages'])
+    
+    client = flask_app.test_client()
+    client.get('/')
+    with client.session_transaction() as session:
+        session_id = session['sid']
+    
+    print(f"{'messages':>8} {'before ms':>10} {'after ms':>9} {'before bytes':>13} {'after bytes':>12}")
+    for count in HISTORY_LENGTHS:
+        messages = make_messages(count)
+        state['messages'] = messages
+        chat_app.conversation_store.clear(session_id)
+        for message in messages:
+            chat_app.conversation_store.append(session_id, message)
+        
+        before, before_bytes = time_route(client, '/__bench_legacy')
+        after, after_bytes = time_route(client, '/')
+        print(f"{count:>8} {before * 1000:>10.3f} {after * 1000:>9.3f} {before_bytes:>13} {after_bytes:>12}")
+    
+    print("CSS and JavaScript are now fetched once and revalidated with ETags (304 Not Modified).")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark intent pattern matching against query length
+Compares per-pattern re.search (the original _check_patterns) with the
+precompiled IntentPatternMatcher on inputs shaped like pasted order emails
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_trainer import IntentPatternMatcher
+from training_data import TRAINING_DATA, INTENT_PATTERNS
+
+LENGTHS = [100, 1000, 5000, 10000]
+
+FILLER = ("thank you for your order number 4821 placed today "
+          "your receipt and item summary are listed below ")
+
+def legacy_check_patterns(query):
+    """Original implementation: re.search for every pattern string"""
+    query_lower = query.lower()
+    for intent, patterns in INTENT_PATTERNS.items():
+        for pattern in patterns:
+            if re.search(pattern, query_lower):
+                return intent
+    return None
+
+def make_query(length, suffix):
+    """Pad a query with email-like filler up to roughly length characters"""
+    body = (FILLER * (length // len(FILLER) + 1))[:max(length - len(suffix), 0)]
+    return body + suffix
+
+def time_per_query(func, query, min_time=0.2):
+    """Average seconds per call, repeating until min_time has elapsed"""
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        func(query)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / runs
+
+def check_parity(matcher):
+    """Both implementations must pick the same intent"""
+    queries = [example["query"] for example in TRAINING_DATA]
+    queries += [make_query(length, " where is my refund") for length in LENGTHS[:2]]
+    queries += ["how is shipping so much", "track the size of my order", ""]
+    mismatches = [q for q in queries if legacy_check_patterns(q) != matcher.match(q.lower())]
+    print(f"Parity: {len(queries) - len(mismatches)}/{len(queries)} queries agree")
+    return not mismatches
+
+def main():
+    matcher = IntentPatternMatcher(INTENT_PATTERNS)
+    if not check_parity(matcher):
+        sys.exit(1)
+    
+    print(f"{'chars':>8} {'case':>9} {'legacy ms':>11} {'compiled ms':>12} {'speedup':>8}")
+    for length in LENGTHS:
+        for case, suffix in [("no match", ""), ("late hit", " please refund me")]:
+            query = make_query(length, suffix)
+            legacy = time_per_query(legacy_check_patterns, query)
+            compiled = time_per_query(lambda q: matcher.match(q.lower()), query)
+            print(f"{length:>8} {case:>9} {legacy * 1000:>11.3f} {compiled * 1000:>12.3f} {legacy / compiled:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
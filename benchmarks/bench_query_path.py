@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmark of the chatbot query path
+Replays a seeded synthetic corpus and a recorded corpus through each pipeline
+stage and through NikeChatbot/EnhancedNikeChatbot.process_query, with OpenAI
+replaced by the local stub server. Reports p50/p95/p99 latency, throughput and
+tracemalloc peak memory per stage, with the product catalog and training set
+scaled 1x/10x/100x/1000x, and writes the results as JSON for later comparison
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SCALES = [1, 10, 100, 1000]
+DEFAULT_RECORDED = os.path.join(ROOT, 'benchmarks', 'data', 'recorded_queries.txt')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+EDITIONS = ["SE", "Premium", "Retro", "Next Nature", "Flyease", "GORE-TEX", "Trail", "Low", "Mid", "High"]
+FILLERS = ["please", "thanks", "asap", "today", "again", "really", "now", "quickly", "exactly", "also"]
+OFF_TOPIC = [
+    "what's the weather in {city}", "tell me a joke about {thing}", "who won the {thing} game last night",
+    "recommend a {thing} recipe", "how far is {city} from here", "translate {thing} into french"
+]
+CITIES = ["paris", "tokyo", "chicago", "lagos", "lima", "oslo", "delhi", "sydney"]
+THINGS = ["pasta", "football", "cats", "taxes", "coffee", "chess", "jazz", "rain"]
+
+def import_repo():
+    """Import the chatbot modules after the environment below is set"""
+    global EnhancedNikeChatbot, NikeChatbot, KnowledgeBase, OpenAIFallbackClient, start_stub_server
+    global NIKE_PRODUCTS, PRODUCT_ALIASES, TRAINING_DATA, INTENT_PATTERNS
+    from chatbot import NikeChatbot
+    from data import NIKE_PRODUCTS, PRODUCT_ALIASES
+    from enhanced_chatbot import EnhancedNikeChatbot
+    from knowledge_base import KnowledgeBase
+    from openai_client import OpenAIFallbackClient
+    from openai_stub import start_stub_server
+    from training_data import TRAINING_DATA, INTENT_PATTERNS
+
+def scale_knowledge(factor, rng):
+    """Knowledge base with factor x the products, aliases and training examples"""
+    products = dict(NIKE_PRODUCTS)
+    aliases = dict(PRODUCT_ALIASES)
+    training_data = list(TRAINING_DATA)
+
+    for i in range(1, factor):
+        edition = f"{EDITIONS[i % len(EDITIONS)]} {i}"
+        for name, details in NIKE_PRODUCTS.items():
+            products[f"{name} {edition}"] = dict(details, price=f"${100 + (i * 7) % 150}")
+        for alias, name in PRODUCT_ALIASES.items():
+            aliases[f"{alias} {edition.lower()}"] = f"{name} {edition}"
+        for example in TRAINING_DATA:
+            words = example["query"].split()
+            words.insert(rng.randrange(len(words) + 1), rng.choice(FILLERS))
+            training_data.append({"query": " ".join(words), "intent": example["intent"]})
+
+    return KnowledgeBase(
+        products=products,
+        product_aliases=aliases,
+        training_data=training_data,
+        intent_patterns=INTENT_PATTERNS
+    )
+
+def synthetic_corpus(knowledge, size, rng):
+    """Seeded mix of product, FAQ, paraphrased training and off-topic queries"""
+    product_names = list(knowledge.products) + list(knowledge.product_aliases)
+    categories = list(knowledge.faq_data)
+    queries = []
+    for _ in range(size):
+        kind = rng.random()
+        if kind < 0.25:
+            template = rng.choice(["how much is the {}", "{} price?", "do you have {} in size 10",
+                                   "tell me about the {}s", "{}"])
+            query = template.format(rng.choice(product_names))
+            query = query.upper() if rng.random() < 0.1 else query
+        elif kind < 0.6:
+            keywords = knowledge.faq_data[rng.choice(categories)]['keywords']
+            template = rng.choice(["what is your {}", "question about {}", "{} {} help", "can you explain {} please"])
+            query = template.format(*(rng.choice(keywords) for _ in range(template.count("{}"))))
+        elif kind < 0.8:
+            query = rng.choice(TRAINING_DATA)["query"]
+            query = rng.choice(["", "hey ", "hi, ", "quick question: "]) + query + rng.choice(["", "?", " please", " thanks"])
+        else:
+            query = rng.choice(OFF_TOPIC).format(city=rng.choice(CITIES), thing=rng.choice(THINGS))
+        queries.append(query)
+    return queries
+
+def recorded_corpus(path):
+    """Queries from a text file (one per line, # comments), a .jsonl file or a conversations.db"""
+    if path.endswith('.db'):
+        conn = sqlite3.connect(path)
+        try:
+            return [row[0] for row in conn.execute("SELECT content FROM messages WHERE type = 'user' ORDER BY id")]
+        finally:
+            conn.close()
+
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            return [json.loads(line)["query"] for line in f if line.strip()]
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def percentiles(samples):
+    samples = sorted(samples)
+    def pick(p):
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+    return {"p50_ms": pick(50) * 1000, "p95_ms": pick(95) * 1000, "p99_ms": pick(99) * 1000}
+
+def time_stage(fn, inputs, warmup):
+    """Per-call latencies plus throughput for fn over inputs"""
+    for item in inputs[:warmup]:
+        fn(item)
+
+    samples = []
+    start = time.perf_counter()
+    for item in inputs:
+        t = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+
+    return dict(percentiles(samples), calls=len(inputs), throughput_qps=len(inputs) / elapsed if elapsed else 0.0)
+
+def peak_memory(fn, inputs):
+    """Peak traced allocation above the starting point while running fn over inputs, in KiB"""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        for item in inputs:
+            fn(item)
+        return (tracemalloc.get_traced_memory()[1] - baseline) / 1024
+    finally:
+        tracemalloc.stop()
+
+def build(knowledge_factory, api_base, warm_caches):
+    """Construct both chatbots (training the classifier) and the stub-backed OpenAI client"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        knowledge = knowledge_factory()
+        nike = NikeChatbot("stub-key", knowledge=knowledge)
+        enhanced = EnhancedNikeChatbot("stub-key", cache_size=1024 if warm_caches else 0, knowledge=knowledge)
+
+    llm = OpenAIFallbackClient("stub-key", api_base=api_base, timeout=10.0)
+    nike.llm = llm
+    enhanced.llm = llm
+    return knowledge, nike, enhanced
+
+def stages(knowledge, nike, enhanced, corpus):
+    """(name, function, inputs) for each stage and end-to-end path"""
+    classifier = enhanced.classifier
+    model = classifier.model
+    nlp = enhanced.nlp
+    processed = [nlp.process_query(query) for query in corpus]
+    off_topic = [query for query, (tokens, original) in zip(corpus, processed)
+                 if not classifier._check_patterns(original, model)][:50]
+
+    def similarity(entry):
+        # The text the engine itself vectorizes (the raw query for a sentence model)
+        query_text = classifier._query_text(*entry)
+        classifier._score(model, model.vectorizer.transform([query_text]), enhanced.confidence_threshold)
+
+    return [
+        ("nlp", nlp.process_query, corpus),
+        ("product_match", knowledge.product_matcher.match, corpus),
+        ("faq_keyword_index", lambda entry: knowledge.faq_index.best_match(*entry), processed),
+        ("pattern_match", lambda entry: classifier._check_patterns(entry[1], model), processed),
+        ("similarity", similarity, processed),
+        ("openai_stub", enhanced.llm.ask, off_topic),
+        ("NikeChatbot.process_query", nike.process_query, corpus),
+        ("EnhancedNikeChatbot.process_query", enhanced.process_query, corpus)
+    ]
+
+def run_scale(factor, corpora, args, api_base):
+    rng = random.Random(args.seed + factor)
+
+    # Build untraced (tracemalloc slows training several times over); its memory is the
+    # growth of the process RSS high-water mark, so it is 0 when an earlier scale was larger
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    knowledge, nike, enhanced = build(lambda: scale_knowledge(factor, rng), api_base, args.warm_caches)
+    build_seconds = time.perf_counter() - start
+    build_rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - maxrss
+
+    result = {
+        "scale": factor,
+        "products": len(knowledge.products),
+        "training_examples": len(knowledge.training_data),
+        "build": {"seconds": build_seconds, "max_rss_growth_kib": build_rss_growth},
+        "corpora": {}
+    }
+
+    for corpus_name, corpus_factory in corpora.items():
+        corpus = corpus_factory(knowledge)
+        stage_results = {}
+        for name, fn, inputs in stages(knowledge, nike, enhanced, corpus):
+            if not inputs:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = time_stage(fn, inputs, args.warmup)
+                stats["peak_kib"] = peak_memory(fn, inputs[:args.memory_sample])
+            stage_results[name] = stats
+        result["corpora"][corpus_name] = {"queries": len(corpus), "stages": stage_results}
+
+    return result
+
+def print_result(result):
+    print(f"\nscale {result['scale']}x: {result['products']} products, {result['training_examples']} training examples, "
+          f"build {result['build']['seconds']:.2f}s, max RSS +{result['build']['max_rss_growth_kib'] / 1024:.1f} MiB")
+    for corpus_name, corpus in result["corpora"].items():
+        print(f"  {corpus_name} corpus ({corpus['queries']} queries)")
+        print(f"    {'stage':<36} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'q/s':>10} {'peak KiB':>10}")
+        for name, stats in corpus["stages"].items():
+            print(f"    {name:<36} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} "
+                  f"{stats['throughput_qps']:>10.0f} {stats['peak_kib']:>10.1f}")
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES)
+    parser.add_argument('--queries', type=int, default=2000, help="synthetic corpus size")
+    parser.add_argument('--recorded', default=DEFAULT_RECORDED, help=".txt, .jsonl or conversations.db; '' to skip")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--memory-sample', type=int, default=500, help="queries replayed under tracemalloc")
+    parser.add_argument('--openai-delay', type=float, default=0.0, help="stub latency in seconds")
+    parser.add_argument('--warm-caches', action='store_true', help="keep the response and NLP caches on")
+    parser.add_argument('--output', help="JSON results path (default benchmarks/results/query_path-<time>.json)")
+    args = parser.parse_args()
+
+    # Measure the compute path unless asked otherwise, and never touch the real model artifact
+    if not args.warm_caches:
+        os.environ['NLP_LEMMA_CACHE_SIZE'] = '0'
+        os.environ['NLP_QUERY_CACHE_SIZE'] = '0'
+    model_dir = tempfile.mkdtemp(prefix='bench-model-')
+    os.environ['INTENT_MODEL_PATH'] = os.path.join(model_dir, 'intent_classifier.joblib')
+    import_repo()
+
+    server, api_base = start_stub_server(delay=args.openai_delay)
+
+    corpora = {"synthetic": lambda knowledge: synthetic_corpus(knowledge, args.queries, random.Random(args.seed))}
+    if args.recorded:
+        recorded = recorded_corpus(args.recorded)
+        corpora["recorded"] = lambda knowledge: recorded
+
+    results = {
+        "benchmark": "query_path",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "nlp_mode": os.getenv('NLP_MODE', 'nltk'),
+            "engine": os.getenv('INTENT_ENGINE', 'knn'),
+            "index_mode": os.getenv('INTENT_INDEX_MODE', 'exhaustive'),
+            "vectorizer": os.getenv('INTENT_VECTORIZER', 'tfidf'),
+            **{key: value for key, value in vars(args).items() if key != 'output'}
+        },
+        "scales": []
+    }
+
+    for factor in args.scales:
+        result = run_scale(factor, corpora, args, api_base)
+        print_result(result)
+        results["scales"].append(result)
+
+    server.shutdown()
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("query_path-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Spelling-correction benchmark: how many misspelled queries still reach OpenAI
+Builds a noisy test set by giving every query of the recorded and seeded
+synthetic corpora one random typo (deletion, insertion, substitution or
+adjacent swap) in a word of four or more letters, plus a few hand-typed
+misspellings. Each query is routed through EnhancedNikeChatbot's product, FAQ
+and intent steps (without calling OpenAI) with the corrector off and on, for
+each intent engine. Reports the OpenAI fallback rate (and the rate of the
+correctly spelled versions, the floor), agreement with the answer the
+correctly spelled query gets, how often correction changes the
+answer to a clean query, and the cost of building and applying the corrector
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import time
+
+import bench_query_path
+from bench_query_path import DEFAULT_RECORDED, RESULTS_DIR, git_commit, recorded_corpus, synthetic_corpus, time_stage
+
+# (misspelled, intended) queries as customers type them
+HAND_TYPED = [
+    ("how much is the jordn 1", "how much is the jordan 1"),
+    ("can i get a refnd", "can i get a refund"),
+    ("how long does shiping take", "how long does shipping take"),
+    ("whats your retrun policy", "whats your return policy"),
+    ("is there a warrenty on these", "is there a warranty on these"),
+    ("exchnage for a bigger size", "exchange for a bigger size"),
+    ("do the pegasis run small", "do the pegasus run small"),
+    ("my sneakrs never arived", "my sneakers never arrived"),
+]
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+TYPO_WORD_RE = re.compile(r'[A-Za-z]{4,}')
+
+def add_typo(word, rng):
+    """word with one random deletion, insertion, substitution or adjacent swap"""
+    while True:
+        i = rng.randrange(len(word))
+        kind = rng.choice(["delete", "insert", "substitute", "swap"])
+        if kind == "delete":
+            typo = word[:i] + word[i + 1:]
+        elif kind == "insert":
+            typo = word[:i] + rng.choice(LETTERS) + word[i:]
+        elif kind == "substitute":
+            typo = word[:i] + rng.choice(LETTERS) + word[i + 1:]
+        else:
+            i = min(i, len(word) - 2)
+            typo = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        if typo.lower() != word.lower():
+            return typo
+
+def noisy_pairs(queries, rng):
+    """(noisy, clean) pairs: one typo in one eligible word of each query that has one"""
+    pairs = []
+    for query in queries:
+        words = list(TYPO_WORD_RE.finditer(query))
+        if not words:
+            continue
+        match = rng.choice(words)
+        pairs.append((query[:match.start()] + add_typo(match.group(), rng) + query[match.end():], query))
+    return pairs + HAND_TYPED
+
+def route(chatbot, query):
+    """(source, intent) EnhancedNikeChatbot.answer would pick, with 'openai' instead of calling it"""
+    tokens, cleaned_query = chatbot.nlp.process_query(query)
+    resolution = chatbot.resolve_product(query, cleaned_query)
+    if resolution is None:
+        resolution = chatbot.resolve_intent(*chatbot.classifier.predict_processed(tokens, cleaned_query))
+    return (resolution["source"], resolution["intent"]) if resolution else ("openai", None)
+
+def fallback_rate(routes):
+    return sum(source == "openai" for source, _ in routes) / len(routes)
+
+def agreement(routes, expected):
+    return sum(a == b for a, b in zip(routes, expected)) / len(routes)
+
+def run_engine(engine, clean, pairs, args):
+    from ml_trainer import create_intent_classifier
+    with contextlib.redirect_stdout(io.StringIO()):
+        chatbot = bench_query_path.EnhancedNikeChatbot(
+            None, cache_size=0, knowledge=bench_query_path.KnowledgeBase(),
+            classifier=create_intent_classifier(engine), spell_correction=False
+        )
+
+    start = time.perf_counter()
+    corrector = chatbot.build_corrector(chatbot.knowledge)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    noisy = [noisy_query for noisy_query, _ in pairs]
+    intended = [clean_query for _, clean_query in pairs]
+
+    # Reference answers: the correctly spelled queries, without correction
+    clean_off = [route(chatbot, query) for query in clean]
+    intended_off = [route(chatbot, query) for query in intended]
+    noisy_off = [route(chatbot, query) for query in noisy]
+    nlp_off = time_stage(chatbot.nlp.process_query, noisy, args.warmup)
+
+    chatbot.nlp.set_corrector(corrector)
+    clean_on = [route(chatbot, query) for query in clean]
+    noisy_on = [route(chatbot, query) for query in noisy]
+    nlp_on = time_stage(chatbot.nlp.process_query, noisy, args.warmup)
+
+    misspelled = [word for query in noisy for word in re.findall(r'[a-z]+', query.lower())
+                  if word not in corrector.known]
+    correct_word = time_stage(corrector.correct_word, misspelled, args.warmup)
+    correct_query = time_stage(corrector.correct, [query.lower() for query in noisy], args.warmup)
+
+    return {
+        "vocabulary_words": len(corrector),
+        "index_entries": len(corrector.index),
+        "build_ms": build_ms,
+        "clean_fallback_off": fallback_rate(clean_off),
+        "clean_fallback_on": fallback_rate(clean_on),
+        "clean_changed_by_correction": 1 - agreement(clean_on, clean_off),
+        "intended_fallback": fallback_rate(intended_off),
+        "noisy_fallback_off": fallback_rate(noisy_off),
+        "noisy_fallback_on": fallback_rate(noisy_on),
+        "noisy_agreement_off": agreement(noisy_off, intended_off),
+        "noisy_agreement_on": agreement(noisy_on, intended_off),
+        "nlp_p50_ms_off": nlp_off["p50_ms"],
+        "nlp_p50_ms_on": nlp_on["p50_ms"],
+        "correct_word_p50_us": correct_word["p50_ms"] * 1000,
+        "correct_word_p99_us": correct_word["p99_ms"] * 1000,
+        "correct_query_p50_us": correct_query["p50_ms"] * 1000
+    }
+
+def print_result(results):
+    print(f"\n{results['clean_queries']} clean queries, {results['noisy_queries']} noisy queries; "
+          f"fallback = share routed to OpenAI, agree = same answer as the correctly spelled query")
+    print(f"  {'engine':<10} {'clean fb':>9} {'+corr':>7} {'changed':>8} {'intended':>9} {'noisy fb':>9} {'+corr':>7} "
+          f"{'agree':>7} {'+corr':>7} {'nlp p50':>8} {'+corr':>7} {'word us':>8} {'query us':>9} {'build ms':>9}")
+    for engine, r in results["engines"].items():
+        print(f"  {engine:<10} {r['clean_fallback_off']:>9.3f} {r['clean_fallback_on']:>7.3f} "
+              f"{r['clean_changed_by_correction']:>8.3f} {r['intended_fallback']:>9.3f} {r['noisy_fallback_off']:>9.3f} {r['noisy_fallback_on']:>7.3f} "
+              f"{r['noisy_agreement_off']:>7.3f} {r['noisy_agreement_on']:>7.3f} {r['nlp_p50_ms_off']:>8.3f} "
+              f"{r['nlp_p50_ms_on']:>7.3f} {r['correct_word_p50_us']:>8.1f} {r['correct_query_p50_us']:>9.1f} "
+              f"{r['build_ms']:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', nargs='+', default=['knn', 'linear', 'embedding'])
+    parser.add_argument('--queries', type=int, default=2000, help="synthetic corpus size")
+    parser.add_argument('--recorded', default=DEFAULT_RECORDED, help=".txt, .jsonl or conversations.db; '' to skip")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--output', help="JSON results path (default benchmarks/results/spelling-<time>.json)")
+    args = parser.parse_args()
+
+    # Time the uncached pipeline, and never touch the real model artifact
+    os.environ['NLP_LEMMA_CACHE_SIZE'] = '0'
+    os.environ['NLP_QUERY_CACHE_SIZE'] = '0'
+    os.environ['INTENT_MODEL_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench-model-'), 'intent_classifier.joblib')
+    bench_query_path.import_repo()
+
+    clean = synthetic_corpus(bench_query_path.KnowledgeBase(), args.queries, random.Random(args.seed))
+    if args.recorded:
+        clean += recorded_corpus(args.recorded)
+    pairs = noisy_pairs(clean, random.Random(args.seed))
+
+    results = {
+        "benchmark": "spelling",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "settings": {
+            "nlp_mode": os.getenv('NLP_MODE', 'nltk'),
+            **{key: value for key, value in vars(args).items() if key != 'output'}
+        },
+        "clean_queries": len(clean),
+        "noisy_queries": len(pairs),
+        "engines": {engine: run_engine(engine, clean, pairs, args) for engine in args.engines}
+    }
+    print_result(results)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("spelling-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {output}")
+
+if __name__ == '__main__':
+    main()
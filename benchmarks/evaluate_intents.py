@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Offline accuracy and latency evaluation of the intent engines
+Runs stratified k-fold cross-validation over TRAINING_DATA (plus
+NEGATIVE_EXAMPLES, held out in every fold as 'none'), one process per
+(engine, fold), and reports accuracy, macro F1, per-query latency, per-intent
+F1 and confusion matrices side by side
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Every test query is new to the engine, so keep the NLP memo caches from hiding its cost
+os.environ.setdefault('NLP_LEMMA_CACHE_SIZE', '0')
+os.environ.setdefault('NLP_QUERY_CACHE_SIZE', '0')
+
+import numpy as np
+from sklearn.metrics import accuracy_score, confusion_matrix, precision_recall_fscore_support
+from embedding_engine import EmbeddingIntentClassifier
+from ml_trainer import IntentClassifier, LinearIntentClassifier
+from training_data import TRAINING_DATA, NEGATIVE_EXAMPLES
+
+NO_INTENT = "none"
+
+class KeywordEngine:
+    """NikeChatbot's keyword-overlap scoring against FAQ_DATA keywords; needs no training"""
+
+    def __init__(self):
+        from data import FAQ_DATA
+        from matchers import FAQKeywordIndex
+        from nlp_processor import NLPProcessor
+        self.nlp = NLPProcessor()
+        self.index = FAQKeywordIndex(FAQ_DATA)
+        self.threshold = 0.3
+
+    def fit(self, examples):
+        pass
+
+    def predict(self, query):
+        intent, score = self.index.best_match(*self.nlp.process_query(query))
+        return intent if intent and score >= self.threshold else None
+
+class ClassifierEngine:
+    """Any ml_trainer intent engine, trained on each fold through its fit() interface"""
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+
+    def fit(self, examples):
+        self.classifier.fit(examples)
+
+    def predict(self, query):
+        return self.classifier.predict(query)[0]
+
+# Engine name -> zero-argument factory; add new engines here to include them in the table
+ENGINES = {
+    "keyword": KeywordEngine,
+    "knn": lambda: ClassifierEngine(IntentClassifier()),
+    "knn-centroid": lambda: ClassifierEngine(IntentClassifier(index_mode='centroid')),
+    "knn-prototype": lambda: ClassifierEngine(IntentClassifier(index_mode='prototype')),
+    "knn-hashing": lambda: ClassifierEngine(IntentClassifier(vectorizer='hashing')),
+    "linear": lambda: ClassifierEngine(LinearIntentClassifier()),
+    "linear-hashing": lambda: ClassifierEngine(LinearIntentClassifier(vectorizer='hashing')),
+    "embedding": lambda: ClassifierEngine(EmbeddingIntentClassifier()),
+    "embedding-int8": lambda: ClassifierEngine(EmbeddingIntentClassifier(quantize='int8')),
+}
+
+def stratified_folds(examples, k, seed):
+    """Deal each intent's shuffled examples round-robin into k folds"""
+    rng = random.Random(seed)
+    by_intent = defaultdict(list)
+    for example in examples:
+        by_intent[example["intent"]].append(example)
+
+    folds = [[] for _ in range(k)]
+    offset = 0
+    for intent in sorted(by_intent):
+        group = by_intent[intent]
+        rng.shuffle(group)
+        for i, example in enumerate(group):
+            folds[(offset + i) % k].append(example)
+        offset += len(group)
+    return folds
+
+def run_fold(job):
+    """Fit one engine on k-1 folds and predict the held-out fold, timing each query"""
+    engine_name, fold_index, train, test = job
+    engine = ENGINES[engine_name]()
+
+    start = time.perf_counter()
+    engine.fit(train)
+    fit_seconds = time.perf_counter() - start
+
+    # One untimed call so lazy loads (WordNet, regex caches) are not charged to the first query
+    engine.predict(test[0]["query"])
+
+    y_true, y_pred, latencies = [], [], []
+    for example in test:
+        start = time.perf_counter()
+        intent = engine.predict(example["query"])
+        latencies.append(time.perf_counter() - start)
+        y_true.append(example["intent"])
+        y_pred.append(intent or NO_INTENT)
+
+    return {"engine": engine_name, "fold": fold_index, "fit_seconds": fit_seconds,
+            "y_true": y_true, "y_pred": y_pred, "latencies": latencies}
+
+def summarize(engine_name, fold_results, labels):
+    y_true = [label for r in fold_results for label in r["y_true"]]
+    y_pred = [label for r in fold_results for label in r["y_pred"]]
+    latencies = np.array([latency for r in fold_results for latency in r["latencies"]]) * 1000
+
+    precision, recall, f1, support = precision_recall_fscore_support(
+        y_true, y_pred, labels=labels, zero_division=0
+    )
+    return {
+        "engine": engine_name,
+        "queries": len(y_true),
+        "accuracy": accuracy_score(y_true, y_pred),
+        "macro_f1": float(np.mean(f1)),
+        "latency_ms": {
+            "mean": float(latencies.mean()),
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "p99": float(np.percentile(latencies, 99))
+        },
+        "fit_ms": float(np.mean([r["fit_seconds"] for r in fold_results]) * 1000),
+        "per_intent": {
+            label: {"precision": float(p), "recall": float(r), "f1": float(f), "support": int(s)}
+            for label, p, r, f, s in zip(labels, precision, recall, f1, support)
+        },
+        "confusion_matrix": confusion_matrix(y_true, y_pred, labels=labels).tolist()
+    }
+
+def print_report(summaries, labels, show_confusion):
+    print(f"\n{'engine':<18} {'accuracy':>9} {'macro F1':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'fit ms':>8}")
+    for s in summaries:
+        latency = s["latency_ms"]
+        print(f"{s['engine']:<18} {s['accuracy']:>9.3f} {s['macro_f1']:>9.3f} {latency['p50']:>8.3f} "
+              f"{latency['p95']:>8.3f} {latency['p99']:>8.3f} {s['fit_ms']:>8.1f}")
+
+    print(f"\nPer-intent F1\n{'intent':<14} {'support':>7} " + " ".join(f"{s['engine']:>16}" for s in summaries))
+    for label in labels:
+        support = summaries[0]["per_intent"][label]["support"]
+        scores = " ".join(f"{s['per_intent'][label]['f1']:>16.3f}" for s in summaries)
+        print(f"{label:<14} {support:>7} {scores}")
+
+    if not show_confusion:
+        return
+    short = [label[:5] for label in labels]
+    for s in summaries:
+        print(f"\nConfusion matrix: {s['engine']} (rows = true, columns = predicted)")
+        print(f"{'':<14}" + "".join(f"{name:>6}" for name in short))
+        for label, row in zip(labels, s["confusion_matrix"]):
+            print(f"{label:<14}" + "".join(f"{count:>6}" for count in row))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="parallel fold processes; use 1 for the least noisy latencies")
+    parser.add_argument('--no-confusion', action='store_true', help="skip the confusion matrices")
+    parser.add_argument('--output', help="also write the results as JSON")
+    args = parser.parse_args()
+
+    folds = stratified_folds(TRAINING_DATA, args.folds, args.seed)
+    negatives = [{"query": e["query"], "intent": NO_INTENT} for e in NEGATIVE_EXAMPLES]
+    jobs = []
+    for engine_name in args.engines:
+        for i, test in enumerate(folds):
+            train = [example for j, fold in enumerate(folds) if j != i for example in fold]
+            jobs.append((engine_name, i, train, test + negatives))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        results = list(executor.map(run_fold, jobs))
+    print(f"Evaluated {len(args.engines)} engines x {args.folds} folds in {time.perf_counter() - start:.1f}s "
+          f"({args.workers} workers, {len(TRAINING_DATA)} examples + {len(negatives)} negatives per fold)")
+
+    labels = sorted({e["intent"] for e in TRAINING_DATA}) + [NO_INTENT]
+    summaries = [
+        summarize(engine_name, [r for r in results if r["engine"] == engine_name], labels)
+        for engine_name in args.engines
+    ]
+    print_report(summaries, labels, not args.no_confusion)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"folds": args.folds, "seed": args.seed, "labels": labels, "engines": summaries}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Measure per-worker memory of app.py under a pre-fork model
+Forks N workers the way gunicorn does, either after importing the app in the
+parent (preload_app = True) or with each worker importing it on its own, runs
+the same queries in every worker and reports RSS, PSS and private memory from
+/proc/<pid>/smaps_rollup (Linux only)
+"""
+
+import argparse
+import gc
+import json
+import os
+import signal
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from training_data import TRAINING_DATA
+
+WORKER_COUNTS = [1, 2, 4, 8]
+
+def smaps_rollup(pid):
+    """RSS, PSS and private (dirty + clean) memory of a process, in KiB"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    private = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return {"rss": fields.get('Rss', 0), "pss": fields.get('Pss', 0), "private": private}
+
+def serve_queries(chatbot):
+    """Exercise the local paths a worker takes for real requests (no OpenAI calls)"""
+    queries = [example["query"] for example in TRAINING_DATA]
+    for query in queries:
+        tokens, original = chatbot.nlp.process_query(query)
+        chatbot.product_matcher.match(original)
+        chatbot.classifier.predict_processed(tokens, original)
+    chatbot.classifier.predict_intents(queries)
+
+def load_app():
+    import app
+    return app.chatbot
+
+def spawn_workers(count, preload, freeze):
+    """Fork workers that serve queries, report readiness on a pipe, then wait to be killed"""
+    chatbot = None
+    if preload:
+        chatbot = load_app()
+        if freeze:
+            gc.freeze()
+    
+    pids = []
+    ready_r, ready_w = os.pipe()
+    for _ in range(count):
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            worker_chatbot = chatbot if chatbot is not None else load_app()
+            serve_queries(worker_chatbot)
+            gc.collect()
+            os.write(ready_w, b"r")
+            signal.pause()
+            os._exit(0)
+        pids.append(pid)
+    
+    os.close(ready_w)
+    for _ in range(count):
+        os.read(ready_r, 1)
+    os.close(ready_r)
+    return pids
+
+def measure(count, preload, freeze):
+    """Fork a pool in a fresh child process so preloading never leaks between runs"""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        pids = spawn_workers(count, preload, freeze)
+        stats = [smaps_rollup(worker) for worker in pids]
+        for worker in pids:
+            os.kill(worker, signal.SIGTERM)
+            os.waitpid(worker, 0)
+        os.write(write_fd, json.dumps(stats).encode())
+        os._exit(0)
+    
+    os.close(write_fd)
+    data = b""
+    while chunk := os.read(read_fd, 65536):
+        data += chunk
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    return json.loads(data)
+
+def report(label, stats):
+    count = len(stats)
+    rss = sum(s["rss"] for s in stats) / count / 1024
+    pss = sum(s["pss"] for s in stats) / count / 1024
+    private = sum(s["private"] for s in stats) / count / 1024
+    total_pss = sum(s["pss"] for s in stats) / 1024
+    print(f"{label:<18} {count:>7} {rss:>10.1f} {pss:>10.1f} {private:>12.1f} {total_pss:>12.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=WORKER_COUNTS)
+    args = parser.parse_args()
+    
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("measure_worker_rss.py needs Linux /proc/<pid>/smaps_rollup")
+    
+    print("Per-worker memory in MiB (PSS splits shared pages between the workers using them)")
+    print(f"{'mode':<18} {'workers':>7} {'RSS':>10} {'PSS':>10} {'private':>12} {'total PSS':>12}")
+    for count in args.workers:
+        report("import per worker", measure(count, preload=False, freeze=False))
+        report("preload", measure(count, preload=True, freeze=False))
+        report("preload + freeze", measure(count, preload=True, freeze=True))
+
+if __name__ == '__main__':
+    main()
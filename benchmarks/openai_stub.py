@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI chat completions endpoint
+Answers POST .../chat/completions after a configurable delay, optionally
+streamed word by word, so the fallback path can be exercised without
+network access or API credits
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ANSWER = "This is a stubbed Nike assistant answer about sneakers, sizing and shipping."
+
+class OpenAIStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY, Nagle plus
+    # delayed ACKs add ~40ms to every keep-alive response
+    disable_nagle_algorithm = True
+    
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        
+        with self.server.lock:
+            self.server.request_count += 1
+        time.sleep(self.server.delay)
+        
+        if payload.get("stream"):
+            self._stream_answer(payload)
+            return
+        
+        body = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "gpt-3.5-turbo"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": STUB_ANSWER},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }).encode()
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _stream_answer(self, payload):
+        """Send the answer word by word as server-sent events, like stream=True"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        
+        for word in STUB_ANSWER.split(" "):
+            event = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": payload.get("model", "gpt-3.5-turbo"),
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+            }
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(self.server.token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(delay=0.0, token_delay=0.0, host="127.0.0.1", port=0):
+    """Start the stub in a daemon thread, returning (server, api_base)"""
+    server = ThreadingHTTPServer((host, port), OpenAIStubHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.token_delay = token_delay
+    server.request_count = 0
+    server.lock = threading.Lock()
+    
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds before each answer")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="seconds between streamed words")
+    args = parser.parse_args()
+    
+    server, api_base = start_stub_server(delay=args.delay, token_delay=args.token_delay, port=args.port)
+    print(f"OpenAI stub listening, set OPENAI_API_BASE={api_base}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
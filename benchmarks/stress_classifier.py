@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Multi-threaded stress check for the shared intent engines (each kNN index mode, linear and embedding)
+1. Cold start: many threads call predict_intent on an untrained classifier at
+   once; exactly one fit must run
+2. Refit under load: reader threads hammer predict_intent/predict_intents while
+   the main thread swaps between two different training sets; every answer must
+   match one version's baseline exactly (a half-published model would not)
+3. add_examples under load: writers add examples while readers predict and
+   background refits run; no errors, and no example may be lost
+Exits non-zero on any failure
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from embedding_engine import EmbeddingIntentClassifier
+from ml_trainer import IntentClassifier, LinearIntentClassifier, INDEX_MODES
+from training_data import TRAINING_DATA, INTENT_PATTERNS
+
+READERS = 8
+DURATION = 5.0
+QUERIES = [example["query"] for example in TRAINING_DATA] + [
+    "do you ship to canada", "my shoes hurt", "where is order 1234",
+    "refund please", "air max colors", "what's the weather like?"
+]
+
+def alternate_data():
+    """Version B: every other example, with intents (and patterns) renamed so answers show their version"""
+    training_data = [{"query": e["query"], "intent": "b:" + e["intent"]} for e in TRAINING_DATA[::2]]
+    intent_patterns = {"b:" + intent: patterns for intent, patterns in INTENT_PATTERNS.items()}
+    return training_data, intent_patterns
+
+def quiet(fn, *args, **kwargs):
+    """Call fn with stdout silenced (training prints progress)"""
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) * 1000 if values else 0.0
+
+def cold_start(new_classifier):
+    classifier = new_classifier()
+    fits = []
+    fit = classifier._fit
+    def counting_fit(*args):
+        fits.append(threading.get_ident())
+        return fit(*args)
+    classifier._fit = counting_fit
+    
+    barrier = threading.Barrier(16)
+    errors = []
+    def first_request():
+        barrier.wait()
+        try:
+            classifier.predict_intent("what is your return policy")
+        except Exception as e:
+            errors.append(repr(e))
+    
+    def run_threads():
+        threads = [threading.Thread(target=first_request) for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    
+    quiet(run_threads)
+    
+    ok = len(fits) == 1 and not errors
+    print(f"  cold start: 16 concurrent first requests -> {len(fits)} fit(s), {len(errors)} errors {'OK' if ok else 'FAIL'}")
+    return ok
+
+def refit_under_load(new_classifier):
+    version_a = (TRAINING_DATA, INTENT_PATTERNS)
+    version_b = alternate_data()
+    
+    classifier = new_classifier()
+    baselines = []
+    for training_data, intent_patterns in (version_b, version_a):
+        quiet(classifier.refit, training_data, intent_patterns)
+        baselines.append({q: classifier.predict_intent(q) for q in QUERIES})
+    
+    def matches_a_version(query, intent, score):
+        return any(b[query][0] == intent and np.isclose(b[query][1], score) for b in baselines)
+    
+    stop = threading.Event()
+    errors, mismatches, latencies = [], [], []
+    counts = [0] * READERS
+    
+    def reader(n):
+        i = n
+        while not stop.is_set():
+            query = QUERIES[i % len(QUERIES)]
+            i += 1
+            try:
+                start = time.perf_counter()
+                if i % 10 == 0:
+                    intents, scores = classifier.predict_intents(QUERIES)
+                    results = zip(QUERIES, intents, scores)
+                else:
+                    intent, score = classifier.predict_intent(query)
+                    results = [(query, intent, score)]
+                latencies.append(time.perf_counter() - start)
+                for q, intent, score in results:
+                    if not matches_a_version(q, intent, score):
+                        mismatches.append((q, intent, score))
+                counts[n] += 1
+            except Exception as e:
+                errors.append(repr(e))
+    
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(READERS)]
+    for t in threads:
+        t.start()
+    
+    refits = 0
+    deadline = time.perf_counter() + DURATION
+    while time.perf_counter() < deadline:
+        quiet(classifier.refit, *(version_b if refits % 2 == 0 else version_a))
+        refits += 1
+    
+    stop.set()
+    for t in threads:
+        t.join()
+    
+    ok = not errors and not mismatches
+    print(f"  refit under load: {refits} refits, {sum(counts)} predictions, "
+          f"{len(mismatches)} mixed-version answers, {len(errors)} errors, "
+          f"p50 {percentile(latencies, 50):.2f}ms p99 {percentile(latencies, 99):.2f}ms {'OK' if ok else 'FAIL'}")
+    for error in errors[:3]:
+        print(f"    {error}")
+    for mismatch in mismatches[:3]:
+        print(f"    {mismatch}")
+    return ok
+
+def add_examples_under_load(new_classifier, writers=4, per_writer=50):
+    classifier = new_classifier()
+    quiet(classifier.train)
+    intents = sorted({example["intent"] for example in TRAINING_DATA})
+    
+    stop = threading.Event()
+    errors = []
+    
+    def reader():
+        while not stop.is_set():
+            try:
+                classifier.predict_intents(QUERIES)
+            except Exception as e:
+                errors.append(repr(e))
+    
+    def writer(n):
+        for i in range(per_writer):
+            try:
+                classifier.add_examples([{"query": f"writer {n} example {i} shipping order",
+                                          "intent": intents[(n + i) % len(intents)]}])
+            except Exception as e:
+                errors.append(repr(e))
+    
+    readers = [threading.Thread(target=reader) for _ in range(READERS)]
+    writer_threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    refitter_stop = threading.Event()
+    def refitter():
+        while not refitter_stop.is_set():
+            quiet(classifier.refit)
+    refit_thread = threading.Thread(target=refitter)
+    
+    for t in readers + writer_threads + [refit_thread]:
+        t.start()
+    for t in writer_threads:
+        t.join()
+    refitter_stop.set()
+    refit_thread.join()
+    stop.set()
+    for t in readers:
+        t.join()
+    
+    expected = len(TRAINING_DATA) + writers * per_writer
+    if classifier.learns_faq_keywords:
+        expected += len(classifier.keyword_examples())
+    total = len(classifier.model.training_intents)
+    ok = not errors and total == expected and len(classifier.extra_examples) == writers * per_writer
+    print(f"  add_examples under load: {writers * per_writer} added, model has {total}/{expected} examples, "
+          f"{len(errors)} errors {'OK' if ok else 'FAIL'}")
+    for error in errors[:3]:
+        print(f"    {error}")
+    return ok
+
+def main():
+    ok = True
+    engines = {f"knn index_mode={mode}": (lambda mode=mode: IntentClassifier(index_mode=mode)) for mode in INDEX_MODES}
+    engines["linear"] = LinearIntentClassifier
+    engines["embedding"] = EmbeddingIntentClassifier
+    for name, new_classifier in engines.items():
+        print(name)
+        ok &= cold_start(new_classifier)
+        ok &= refit_under_load(new_classifier)
+        ok &= add_examples_under_load(new_classifier)
+    
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
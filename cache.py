@@ -0,0 +1,77 @@
+"""
+Thread-safe bounded caches for Nike Customer Support Chatbot
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class LRUCache:
+    """Bounded least-recently-used cache with an optional per-entry TTL"""
+    
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key, default=None):
+        """Return the cached value for key, or default on a miss or expired entry"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entry when full"""
+        if self.maxsize <= 0:
+            return
+        
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop every entry, keeping the counters"""
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
+    
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl
+            }
@@ -1,14 +1,20 @@
 import random
+import time
 import openai
 from difflib import SequenceMatcher
-from data import FAQ_DATA, NIKE_PRODUCTS
+from knowledge_base import KnowledgeBase
+from metrics import REQUEST_SECONDS, REQUESTS_TOTAL, query_logger, stage
 from nlp_processor import NLPProcessor
+from openai_client import OpenAIFallbackClient
 
 class NikeChatbot:
-    def __init__(self, openai_api_key):
+    def __init__(self, openai_api_key, openai_timeout=8.0, knowledge=None):
         self.nlp = NLPProcessor()
+        # FAQ answers, product catalog and the matchers built from them; assign a new one to reload
+        self.knowledge = knowledge or KnowledgeBase()
         self.confidence_threshold = 0.3  # Lowered threshold for better matching
         openai.api_key = openai_api_key
+        self.llm = OpenAIFallbackClient(openai_api_key, timeout=openai_timeout)
     
     def calculate_similarity(self, query_tokens, keywords):
         """Calculate similarity between query tokens and keywords"""
@@ -30,88 +36,22 @@ class NikeChatbot:
     def find_best_match(self, processed_query):
         """Find the best matching FAQ category"""
         query_tokens, original_query = processed_query
-        best_match = None
-        best_score = 0
-        
-        # Check each FAQ category
-        for category, data in FAQ_DATA.items():
-            # Direct keyword matching
-            keyword_matches = 0
-            for token in query_tokens:
-                for keyword in data['keywords']:
-                    if token.lower() in keyword.lower() or keyword.lower() in token.lower():
-                        keyword_matches += 1
-                        break
-            
-            # Calculate score based on keyword matches
-            if len(query_tokens) > 0:
-                score = keyword_matches / len(query_tokens)
-            else:
-                score = 0
-            
-            # Boost score for exact matches
-            for keyword in data['keywords']:
-                if keyword.lower() in original_query.lower():
-                    score += 0.3
-            
-            if score > best_score:
-                best_score = score
-                best_match = category
-        
-        return best_match, best_score
+        return self.knowledge.faq_index.best_match(query_tokens, original_query)
     
     def check_product_mention(self, query):
         """Check if query mentions specific Nike products"""
-        query_lower = query.lower()
-        for product_name, details in NIKE_PRODUCTS.items():
-            # Check for product name variations
-            product_variations = [
-                product_name.lower(),
-                product_name.lower().replace(' ', ''),
-                product_name.lower().replace(' ', '-')
-            ]
-            
-            for variation in product_variations:
-                if variation in query_lower:
-                    return product_name, details
-        
-        # Check for common product keywords
-        product_keywords = {
-            'air max': 'Air Max 270',
-            'jordan': 'Air Jordan 1 Retro High',
-            'react': 'React Element 55',
-            'pegasus': 'Zoom Pegasus 39',
-            'dunk': 'Dunk Low'
-        }
-        
-        for keyword, product_name in product_keywords.items():
-            if keyword in query_lower:
-                return product_name, NIKE_PRODUCTS[product_name]
-        
-        return None, None
+        return self.knowledge.product_matcher.match(query)
     
     def get_faq_response(self, category):
         """Get a random response from FAQ category"""
-        if category in FAQ_DATA:
-            return random.choice(FAQ_DATA[category]['responses'])
+        faq_data = self.knowledge.faq_data
+        if category in faq_data:
+            return random.choice(faq_data[category]['responses'])
         return None
     
     def get_openai_response(self, query):
         """Get response from OpenAI when FAQ confidence is low"""
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a knowledgeable Nike sneaker store assistant. Provide helpful, accurate information about Nike products, sizing, shipping, returns, and general customer service. Keep responses under 150 words and be friendly and professional."},
-                    {"role": "user", "content": query}
-                ],
-                max_tokens=150,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"OpenAI API Error: {e}")
-            return self.get_fallback_response(query)
+        return self.llm.ask(query) or self.get_fallback_response(query)
     
     def get_fallback_response(self, query):
         """Provide fallback responses when OpenAI is unavailable"""
@@ -142,27 +82,42 @@ class NikeChatbot:
     
     def process_query(self, user_query):
         """Main query processing function"""
+        start = time.perf_counter()
+        source, response = self._answer(user_query)
+        REQUESTS_TOTAL.inc(source=source, cached="false")
+        REQUEST_SECONDS.observe(time.perf_counter() - start, source=source)
+        return response
+    
+    def _answer(self, user_query):
+        """(resolution path, response text) for a query"""
         if not user_query or not user_query.strip():
-            return "Please ask me a question about Nike sneakers and I'll be happy to help!"
+            return "empty", "Please ask me a question about Nike sneakers and I'll be happy to help!"
         
         # Process query with NLP
-        processed_query = self.nlp.process_query(user_query)
+        with stage("nlp"):
+            processed_query = self.nlp.process_query(user_query)
         
         # Check for specific product mentions first
-        product_name, product_details = self.check_product_mention(user_query)
+        with stage("product_match"):
+            product_name, product_details = self.check_product_mention(user_query)
         if product_name and product_details:
-            return f"**{product_name}**\n\n{product_details['description']}\n\n💰 **Price:** {product_details['price']}\n📏 **Sizes:** {product_details['sizes']}\n🎨 **Colors:** {product_details['colors']}\n\nWould you like more information about this product or help with sizing?"
+            return "product", f"**{product_name}**\n\n{product_details['description']}\n\n💰 **Price:** {product_details['price']}\n📏 **Sizes:** {product_details['sizes']}\n🎨 **Colors:** {product_details['colors']}\n\nWould you like more information about this product or help with sizing?"
         
         # Find best FAQ match
-        best_category, confidence = self.find_best_match(processed_query)
+        with stage("faq_lookup"):
+            best_category, confidence = self.find_best_match(processed_query)
         
-        print(f"Query: {user_query}")
-        print(f"Best category: {best_category}, Confidence: {confidence}")
+        query_logger.debug("Query: %s", user_query)
+        query_logger.debug("Best category: %s, Confidence: %s", best_category, confidence)
         
         if best_category and confidence >= self.confidence_threshold:
             # High confidence - return FAQ response
             faq_response = self.get_faq_response(best_category)
-            return f"**Nike Customer Support:** {faq_response}"
+            return "faq", f"**Nike Customer Support:** {faq_response}"
         else:
             # Low confidence - use OpenAI or fallback
-            return self.get_openai_response(user_query)
\ No newline at end of file
+            with stage("openai"):
+                answer = self.llm.ask(user_query)
+            if answer:
+                return "openai", answer
+            return "fallback", self.get_fallback_response(user_query)
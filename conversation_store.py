@@ -0,0 +1,134 @@
+"""
+Server-side conversation history for Nike Customer Support Chatbot
+Keeps chat messages out of the signed session cookie, keyed by a session id
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+class ConversationStore:
+    """Interface for per-session chat history"""
+    
+    def append(self, session_id, message):
+        """Add one {'type', 'content'} message to the end of a conversation"""
+        raise NotImplementedError
+    
+    def get(self, session_id):
+        """Return the most recent messages of a conversation, oldest first"""
+        raise NotImplementedError
+    
+    def clear(self, session_id):
+        """Forget a conversation"""
+        raise NotImplementedError
+
+class InMemoryConversationStore(ConversationStore):
+    """Per-process store that evicts the least recently active conversations"""
+    
+    def __init__(self, max_sessions=10000, max_messages=20):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def append(self, session_id, message):
+        with self._lock:
+            messages = self._conversations.get(session_id)
+            if messages is None:
+                messages = deque(maxlen=self.max_messages)
+                self._conversations[session_id] = messages
+            messages.append(dict(message))
+            self._conversations.move_to_end(session_id)
+            
+            while len(self._conversations) > self.max_sessions:
+                self._conversations.popitem(last=False)
+    
+    def get(self, session_id):
+        with self._lock:
+            messages = self._conversations.get(session_id)
+            if messages is None:
+                return []
+            self._conversations.move_to_end(session_id)
+            return [dict(message) for message in messages]
+    
+    def clear(self, session_id):
+        with self._lock:
+            self._conversations.pop(session_id, None)
+
+class SQLiteConversationStore(ConversationStore):
+    """Local SQLite store, shared by every worker process on the host"""
+    
+    def __init__(self, path='conversations.db', max_messages=20):
+        self.path = path
+        self.max_messages = max_messages
+        self._local = threading.local()
+        
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+    
+    def _connection(self):
+        """One connection per thread, opened on first use"""
+        conn = getattr(self._local, 'conn', None)
+        # A connection opened before a pre-fork server forked must not be reused by the worker
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def append(self, session_id, message):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO messages (session_id, type, content, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, message['type'], message['content'], time.time())
+            )
+            # Trim anything older than the newest max_messages rows
+            conn.execute(
+                """DELETE FROM messages WHERE session_id = ? AND id <= (
+                       SELECT id FROM messages WHERE session_id = ?
+                       ORDER BY id DESC LIMIT 1 OFFSET ?
+                   )""",
+                (session_id, session_id, self.max_messages)
+            )
+    
+    def get(self, session_id):
+        rows = self._connection().execute(
+            "SELECT type, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, self.max_messages)
+        ).fetchall()
+        return [{'type': type_, 'content': content} for type_, content in reversed(rows)]
+    
+    def clear(self, session_id):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+def create_conversation_store(backend=None, max_messages=None):
+    """Build the store selected by CONVERSATION_STORE ('memory' or 'sqlite')"""
+    backend = backend or os.getenv('CONVERSATION_STORE', 'memory')
+    if max_messages is None:
+        max_messages = int(os.getenv('CONVERSATION_MAX_MESSAGES', '20'))
+    
+    if backend == 'memory':
+        return InMemoryConversationStore(
+            max_sessions=int(os.getenv('CONVERSATION_MAX_SESSIONS', '10000')),
+            max_messages=max_messages
+        )
+    if backend == 'sqlite':
+        return SQLiteConversationStore(
+            path=os.getenv('CONVERSATION_DB_PATH', 'conversations.db'),
+            max_messages=max_messages
+        )
+    raise ValueError(f"Unknown conversation store '{backend}', expected 'memory' or 'sqlite'")
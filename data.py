@@ -130,4 +130,13 @@ NIKE_PRODUCTS = {
         "sizes": "Men's 6-13, Women's 5-12 (including half sizes)",
         "colors": "Classic colorways and seasonal releases including vintage-inspired options"
     }
-}
\ No newline at end of file
+}
+
+# Common shorthand customers use for catalog products
+PRODUCT_ALIASES = {
+    "air max": "Air Max 270",
+    "jordan": "Air Jordan 1 Retro High",
+    "react": "React Element 55",
+    "pegasus": "Zoom Pegasus 39",
+    "dunk": "Dunk Low"
+}
@@ -0,0 +1,348 @@
+"""
+Dense-embedding intent engine for Nike Customer Support Chatbot
+Encodes TRAINING_DATA and FAQ_DATA keywords as sentence vectors, with a local
+sentence-transformers model when one is installed on disk or a hashed character
+n-gram projection otherwise, and searches them through an in-process IVF
+approximate nearest-neighbor index stored as float32 or int8 rows. Never
+touches the network
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+from functools import lru_cache
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from metrics import BACKGROUND_ERRORS, background_logger
+from ml_trainer import BASE_DIR, IntentEngine, IntentModel
+
+# Local sentence-transformers model directory; without one the hashed n-gram encoder is used
+DEFAULT_EMBEDDING_MODEL_PATH = os.getenv(
+    'INTENT_EMBEDDING_MODEL',
+    os.path.join(BASE_DIR, 'models', 'embedding')
+)
+
+# How index rows are stored:
+#   float32 - exact dot products
+#   int8    - one signed byte per dimension plus a float32 scale per row, a quarter of the memory
+QUANTIZE_TYPES = ('float32', 'int8')
+
+# Below this many vectors the index is a single list, i.e. an exact search
+MIN_IVF_VECTORS = 1024
+
+@lru_cache(maxsize=4)
+def hashed_projection(n_features, dimension, nonzeros=4):
+    """Fixed random projection: the nonzeros output dimensions and +-1 signs of each input column
+
+    Seeded, so every process builds the same projection and saved artifacts need not carry it.
+    """
+    rng = np.random.default_rng(0)
+    columns = rng.integers(0, dimension, size=(n_features, nonzeros)).astype(np.int32)
+    signs = rng.choice(np.array([-1.0, 1.0], dtype=np.float32), size=(n_features, nonzeros))
+    return columns, signs
+
+class HashedNgramEncoder:
+    """Sentence vectors from character n-grams: hashed, TF-IDF weighted and randomly projected
+
+    Needs no model files. Shares n-grams between inflections, compounds and
+    misspellings ("sneaker"/"sneakers", "delivery"/"delivering") that whole-token
+    TF-IDF treats as unrelated, but knows nothing about synonyms. Weighting and
+    projection are done directly on the hashed counts, which is several times
+    faster for single queries than chaining sparse matrix products.
+    """
+
+    uses_raw_text = False
+
+    def __init__(self, dimension=256, n_features=2 ** 18):
+        self.dimension = dimension
+        self.n_features = n_features
+        self.name = f"char-ngram-{dimension}"
+        self.hasher = HashingVectorizer(
+            analyzer='char_wb',
+            ngram_range=(3, 5),
+            n_features=n_features,
+            alternate_sign=False,
+            norm=None
+        )
+        self.idf = None
+
+    def fit_transform(self, texts):
+        counts = self.hasher.transform(texts)
+        # Smoothed IDF, as TfidfTransformer computes it
+        document_frequency = np.bincount(counts.indices, minlength=self.n_features)
+        self.idf = (np.log((1 + counts.shape[0]) / (1 + document_frequency)) + 1).astype(np.float32)
+        return self._project(counts)
+
+    def transform(self, texts):
+        return self._project(self.hasher.transform(texts))
+
+    def _project(self, counts):
+        """Sublinear TF-IDF weights of the hashed counts, projected and L2-normalized"""
+        columns, signs = hashed_projection(self.n_features, self.dimension)
+        weights = (1 + np.log(counts.data)) * self.idf[counts.indices]
+        rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+
+        cells = (rows[:, None] * self.dimension + columns[counts.indices]).ravel()
+        vectors = np.bincount(
+            cells, weights=(signs[counts.indices] * weights[:, None]).ravel(),
+            minlength=counts.shape[0] * self.dimension
+        ).reshape(counts.shape[0], self.dimension)
+        return normalize(vectors).astype(np.float32)
+
+class SentenceModelEncoder:
+    """A sentence-transformers model loaded from a local directory, on CPU"""
+
+    uses_raw_text = True
+
+    def __init__(self, path):
+        self.path = path
+        self.name = f"model:{os.path.basename(os.path.normpath(path))}"
+        self._load()
+
+    def _load(self):
+        # Never reach for the Hugging Face hub; the model must already be on disk
+        os.environ.setdefault('HF_HUB_OFFLINE', '1')
+        os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(self.path, device='cpu')
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def __getstate__(self):
+        # Saved artifacts keep the path only; the weights stay in the model directory
+        return {"path": self.path, "name": self.name}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._load()
+
+    def fit_transform(self, texts):
+        return self.transform(texts)
+
+    def transform(self, texts):
+        vectors = self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float32)
+
+def local_model_available(path):
+    """True if path holds a model directory and sentence-transformers is installed"""
+    return os.path.isdir(path) and importlib.util.find_spec('sentence_transformers') is not None
+
+class IVFIndex:
+    """Inverted-file approximate nearest-neighbor index over L2-normalized vectors
+
+    k-means splits the vectors into about sqrt(n) lists. A query is compared with
+    the list centroids and then only with the rows of its n_probe closest lists.
+    Rows are stored contiguously per list, as float32 or as int8 codes with a
+    per-row scale. Exact duplicates with the same label are stored once, since
+    they cannot change an answer. Never modified in place; add() returns a new index.
+    """
+
+    def __init__(self, vectors, labels, n_probe=16, quantize='float32'):
+        if quantize not in QUANTIZE_TYPES:
+            raise ValueError(f"Unknown quantization '{quantize}', expected one of {QUANTIZE_TYPES}")
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.n_probe = n_probe
+        self.quantize = quantize
+        self.intents = tuple(dict.fromkeys(labels))
+        label_ids = self._label_ids(labels)
+
+        _, keep = np.unique(np.hstack([vectors, label_ids[:, None]]), axis=0, return_index=True)
+        keep.sort()
+        vectors, label_ids = vectors[keep], label_ids[keep]
+
+        if len(vectors) >= MIN_IVF_VECTORS:
+            n_lists = int(np.sqrt(len(vectors)))
+            kmeans = KMeans(n_clusters=n_lists, n_init=1, max_iter=20, random_state=0).fit(vectors)
+            centroids = kmeans.cluster_centers_
+            assignments = kmeans.labels_
+        else:
+            centroids = vectors.mean(axis=0, keepdims=True)
+            assignments = np.zeros(len(vectors), dtype=np.int64)
+
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.centroids = (centroids / norms).astype(np.float32)
+        self._pack(vectors, label_ids, assignments)
+
+    def _label_ids(self, labels):
+        ids = {intent: i for i, intent in enumerate(self.intents)}
+        return np.array([ids[label] for label in labels], dtype=np.int32)
+
+    def _encode(self, vectors):
+        """Stored rows and per-row scales for float32 vectors"""
+        if self.quantize == 'float32':
+            return vectors, np.ones(len(vectors), dtype=np.float32)
+
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _pack(self, vectors, label_ids, assignments, codes=None, scales=None):
+        """Sort rows by list so each list is one contiguous slice"""
+        if codes is None:
+            codes, scales = self._encode(vectors)
+        order = np.argsort(assignments, kind='stable')
+        self.codes = codes[order]
+        self.scales = scales[order]
+        self.label_ids = label_ids[order]
+        self.assignments = assignments[order]
+        self.offsets = np.searchsorted(self.assignments, np.arange(len(self.centroids) + 1))
+
+    def add(self, vectors, labels):
+        """A new index with vectors appended to their closest lists; no re-clustering or deduplication"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        index = object.__new__(IVFIndex)
+        index.n_probe = self.n_probe
+        index.quantize = self.quantize
+        index.centroids = self.centroids
+        index.intents = self.intents + tuple(intent for intent in dict.fromkeys(labels) if intent not in self.intents)
+
+        codes, scales = index._encode(vectors)
+        index._pack(
+            None,
+            np.concatenate([self.label_ids, index._label_ids(labels)]),
+            np.concatenate([self.assignments, (vectors @ self.centroids.T).argmax(axis=1)]),
+            np.concatenate([self.codes, codes]),
+            np.concatenate([self.scales, scales])
+        )
+        return index
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scales.nbytes + self.label_ids.nbytes + self.centroids.nbytes
+
+    def search(self, queries):
+        """Closest stored vector's intent and cosine similarity for each query row
+
+        Works list by list: every probed list is scored against all the queries
+        probing it in one matrix product over its contiguous rows. A single
+        query skips that bookkeeping and scans its probed lists' rows directly.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        n_lists = len(self.centroids)
+        n_probe = min(self.n_probe, n_lists)
+        if n_probe < n_lists:
+            probes = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+        else:
+            probes = np.broadcast_to(np.arange(n_lists), (len(queries), n_lists))
+
+        if len(queries) == 1:
+            # One query: skip the per-list bookkeeping and scan its probed lists' slices directly
+            best_score, best_row = -np.inf, -1
+            for cell in probes[0]:
+                start, end = self.offsets[cell], self.offsets[cell + 1]
+                if start == end:
+                    continue
+                similarities = (self.codes[start:end].astype(np.float32, copy=False) @ queries[0]) * self.scales[start:end]
+                top = similarities.argmax()
+                if similarities[top] > best_score:
+                    best_score, best_row = similarities[top], start + top
+            if best_row < 0:
+                return [None], np.zeros(1)
+            return [self.intents[self.label_ids[best_row]]], np.array([min(best_score, 1.0)], dtype=np.float64)
+
+        best_scores = np.full(len(queries), -np.inf, dtype=np.float32)
+        best_rows = np.full(len(queries), -1)
+        for cell in np.unique(probes):
+            start, end = self.offsets[cell], self.offsets[cell + 1]
+            if start == end:
+                continue
+            members = np.flatnonzero((probes == cell).any(axis=1)) if n_probe < n_lists else np.arange(len(queries))
+
+            similarities = (queries[members] @ self.codes[start:end].astype(np.float32, copy=False).T) * self.scales[start:end]
+            top = similarities.argmax(axis=1)
+            top_scores = similarities[np.arange(len(members)), top]
+            better = top_scores > best_scores[members]
+            best_scores[members[better]] = top_scores[better]
+            best_rows[members[better]] = start + top[better]
+
+        intents = [self.intents[self.label_ids[row]] if row >= 0 else None for row in best_rows]
+        # int8 rounding can push an exact match slightly past 1
+        return intents, np.where(best_rows >= 0, np.minimum(best_scores, 1.0), 0.0).astype(np.float64)
+
+class EmbeddingIntentClassifier(IntentEngine):
+    """Embedding engine: nearest stored example or FAQ keyword by cosine, found through an IVF index"""
+
+    engine = 'embedding'
+    learns_faq_keywords = True
+
+    def __init__(self, model_path=DEFAULT_EMBEDDING_MODEL_PATH, dimension=256, quantize='float32', n_probe=16):
+        if quantize not in QUANTIZE_TYPES:
+            raise ValueError(f"Unknown quantization '{quantize}', expected one of {QUANTIZE_TYPES}")
+
+        super().__init__()
+        self.model_path = model_path
+        self.dimension = dimension
+        self.quantize = quantize
+        self.n_probe = n_probe
+        # Decided once, so a process never mixes vectors from two encoders
+        self.use_model = local_model_available(model_path)
+        # A loaded sentence model is stateless, so every fit reuses it
+        self._model_encoder = None
+
+        if os.path.isdir(model_path) and not self.use_model:
+            background_logger.warning(
+                "%s exists but sentence-transformers is not installed; using hashed character n-gram embeddings",
+                model_path
+            )
+            BACKGROUND_ERRORS.inc(task="embedding_model")
+
+    @property
+    def encoder_name(self):
+        if self.use_model:
+            return f"model:{os.path.basename(os.path.normpath(self.model_path))}"
+        return f"char-ngram-{self.dimension}"
+
+    def _new_vectorizer(self):
+        if not self.use_model:
+            return HashedNgramEncoder(self.dimension)
+        if self._model_encoder is None:
+            self._model_encoder = SentenceModelEncoder(self.model_path)
+        return self._model_encoder
+
+    def _query_text(self, processed_tokens, original_query):
+        # Sentence models read natural text; the n-gram encoder does better on lemmas without stopwords
+        if self.use_model:
+            return original_query
+        return " ".join(processed_tokens)
+
+    def keyword_examples(self, faq_data=None):
+        """One {'query', 'intent'} example per FAQ_DATA keyword (default self.faq_data), labeled with its category"""
+        return [
+            {"query": keyword, "intent": category}
+            for category, entry in (self.faq_data if faq_data is None else faq_data).items()
+            for keyword in entry['keywords']
+        ]
+
+    def engine_config(self):
+        keywords = json.dumps(self.keyword_examples(), sort_keys=True).encode('utf-8')
+        return {"engine": self.engine, "encoder": self.encoder_name, "quantize": self.quantize,
+                "n_probe": self.n_probe, "keywords": hashlib.sha256(keywords).hexdigest()}
+
+    def _fit(self, examples, intent_patterns, faq_data=None):
+        return super()._fit(list(examples) + self.keyword_examples(faq_data), intent_patterns)
+
+    def _build_model(self, vectorizer, training_vectors, training_intents, pattern_matcher,
+                     previous=None, changed=None):
+        """Index training_vectors, extending previous's index with just the new rows when given"""
+        if previous is not None:
+            start = len(previous.training_intents)
+            index = previous.index.add(training_vectors[start:], training_intents[start:])
+        else:
+            index = IVFIndex(training_vectors, training_intents, self.n_probe, self.quantize)
+        return IntentModel(vectorizer, training_vectors, training_intents, pattern_matcher, index=index)
+
+    @staticmethod
+    def _vocabulary_size(model):
+        """Embedding dimension"""
+        return model.training_vectors.shape[1]
+
+    def _score(self, model, query_vectors, threshold):
+        return model.index.search(query_vectors)
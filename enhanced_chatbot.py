@@ -3,68 +3,329 @@ Enhanced Nike Chatbot with ML-based intent classification
 """
 
 import random
+import time
 import openai
-from data import FAQ_DATA, NIKE_PRODUCTS
-from ml_trainer import intent_classifier
+from cache import LRUCache
+from knowledge_base import KnowledgeBase
+from metrics import REQUEST_SECONDS, REQUESTS_TOTAL, STAGE_SECONDS, query_logger, stage
+from ml_trainer import PATTERN_CONFIDENCE, intent_classifier
 from nlp_processor import NLPProcessor
+from nlp_resources import nlp_resources
+from openai_client import OpenAIFallbackClient
+from spelling import build_spelling_corrector
+
+EMPTY_QUERY_RESOLUTION = {
+    "source": "empty",
+    "intent": None,
+    "confidence": 0.0,
+    "answer": "Please ask me a question about Nike sneakers and I'll be happy to help!"
+}
 
 class EnhancedNikeChatbot:
-    def __init__(self, openai_api_key):
+    def __init__(self, openai_api_key, cache_size=1024, cache_ttl=3600, openai_timeout=8.0, knowledge=None,
+                 classifier=None, spell_correction=True):
         self.nlp = NLPProcessor()
-        self.classifier = intent_classifier
+        # Intent engine (knn, linear or embedding, picked by INTENT_ENGINE); shared by default
+        self.classifier = classifier or intent_classifier
+        # FAQ answers, product catalog and the matchers built from them; swapped whole on reload
+        self.knowledge = knowledge or KnowledgeBase()
         self.confidence_threshold = 0.3
         openai.api_key = openai_api_key
+        self.llm = OpenAIFallbackClient(openai_api_key, timeout=openai_timeout)
+        
+        # Resolved answers keyed on the normalized query
+        self.response_cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        
+        # Load the saved classifier, or train it if the training data changed
+        self.classifier.training_data = self.knowledge.training_data
+        self.classifier.intent_patterns = self.knowledge.intent_patterns
+        self.classifier.faq_data = self.knowledge.faq_data
+        self.classifier.load_or_train()
+        
+        # Misspelled words are corrected before matching, so "refnd" or "jordn" avoid the OpenAI fallback
+        self.spell_correction = spell_correction
+        if spell_correction:
+            self.nlp.set_corrector(self.build_corrector(self.knowledge))
+    
+    @property
+    def product_matcher(self):
+        return self.knowledge.product_matcher
+    
+    def build_corrector(self, knowledge):
+        """Spelling corrector over a knowledge base and the classifier's TF-IDF vocabulary"""
+        return build_spelling_corrector(
+            knowledge,
+            vocabulary=self.classifier.vocabulary(),
+            protected=self.nlp.stop_words,
+            is_word=nlp_resources.is_dictionary_word
+        )
+    
+    def apply_knowledge(self, knowledge):
+        """Make a reloaded knowledge base live, retraining the classifier only if its data changed
         
-        # Train the classifier on startup
-        self.classifier.train()
+        If the refit fails, the classifier keeps its model and data and the old knowledge base stays live.
+        """
+        current = self.knowledge
+        keywords_changed = self.classifier.learns_faq_keywords and knowledge.faq_data != current.faq_data
+        if (knowledge.training_data != current.training_data
+                or knowledge.intent_patterns != current.intent_patterns
+                or keywords_changed):
+            # Fits off to the side; the new data only replaces the classifier's with the model swap
+            self.classifier.refit(knowledge.training_data, knowledge.intent_patterns, knowledge.faq_data)
+        # Products, keywords or the fitted vocabulary may have changed
+        corrector = self.build_corrector(knowledge) if self.spell_correction else None
+        
+        self.classifier.faq_data = knowledge.faq_data
+        if corrector is not None:
+            self.nlp.set_corrector(corrector)
+        
+        self.knowledge = knowledge
+        # Cached resolutions may name products or intents that changed
+        self.response_cache.clear()
         
     def process_query(self, user_query):
         """Main query processing function with ML intent classification"""
+        return self.answer(user_query)["response"]
+    
+    def answer(self, user_query):
+        """Answer a query, returning the response with its intent, confidence and source"""
+        start = time.perf_counter()
+        if not user_query or not user_query.strip():
+            self._record(EMPTY_QUERY_RESOLUTION, False, start)
+            return self.describe_resolution(EMPTY_QUERY_RESOLUTION)
+        
+        query_logger.debug("Processing query: %s", user_query)
+        
+        with stage("nlp"):
+            processed_tokens, original_query = self.nlp.process_query(user_query)
+        
+        resolution, pattern_intent = self.resolve_match(user_query, original_query)
+        cached = False
+        if resolution is None:
+            cache_key = self._cache_key(processed_tokens, original_query, pattern_intent)
+            resolution = self.response_cache.get(cache_key)
+            cached = resolution is not None
+            if not cached:
+                resolution = self.resolve_query(user_query, processed_tokens, original_query, pattern_intent)
+                self._cache_resolution(cache_key, resolution)
+        
+        result = self.describe_resolution(resolution)
+        self._record(resolution, cached, start)
+        return result
+    
+    def _record(self, resolution, cached, start=None):
+        """Count a query by resolution path, timing it from start when given"""
+        source = resolution["source"]
+        REQUESTS_TOTAL.inc(source=source, cached="true" if cached else "false")
+        if start is not None:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, source=source)
+    
+    def answer_batch(self, user_queries):
+        """Answer many queries, classifying every cache miss in one vectorized pass"""
+        results = [None] * len(user_queries)
+        # Cache key -> (query, processed query, result indices, pattern intent) for queries needing the classifier
+        pending = {}
+        
+        for i, user_query in enumerate(user_queries):
+            if not user_query or not user_query.strip():
+                self._record(EMPTY_QUERY_RESOLUTION, False)
+                results[i] = self.describe_resolution(EMPTY_QUERY_RESOLUTION)
+                continue
+            
+            with stage("nlp"):
+                processed_tokens, original_query = self.nlp.process_query(user_query)
+            
+            resolution, pattern_intent = self.resolve_match(user_query, original_query)
+            if resolution is not None:
+                self._record(resolution, False)
+                results[i] = self.describe_resolution(resolution)
+                continue
+            
+            cache_key = self._cache_key(processed_tokens, original_query, pattern_intent)
+            if cache_key in pending:
+                pending[cache_key][2].append(i)
+                continue
+            
+            resolution = self.response_cache.get(cache_key)
+            if resolution is not None:
+                self._record(resolution, True)
+                results[i] = self.describe_resolution(resolution)
+            else:
+                pending[cache_key] = (user_query, (processed_tokens, original_query), [i], pattern_intent)
+        
+        if not pending:
+            return results
+        
+        entries = list(pending.items())
+        intents, scores = self.classifier.predict_processed_batch([entry[1] for _, entry in entries], patterns=False)
+        # A pattern intent outside the FAQ skips the similarity scores and goes to OpenAI, as in resolve_query
+        for n, (_, entry) in enumerate(entries):
+            if entry[3]:
+                intents[n], scores[n] = entry[3], PATTERN_CONFIDENCE
+        
+        # Low-confidence queries go to OpenAI together, sharing one deadline
+        resolutions = [self.resolve_intent(intent, score) for intent, score in zip(intents, scores)]
+        unresolved = [n for n, resolution in enumerate(resolutions) if resolution is None]
+        with stage("openai_batch"):
+            answers = self.llm.ask_many([entries[n][1][0] for n in unresolved])
+        for n, answer in zip(unresolved, answers):
+            resolutions[n] = self.resolve_openai(entries[n][1][0], answer, scores[n])
+        
+        for (cache_key, (_, _, indices, _)), resolution in zip(entries, resolutions):
+            self._cache_resolution(cache_key, resolution)
+            for i in indices:
+                self._record(resolution, False)
+                results[i] = self.describe_resolution(resolution)
+        
+        return results
+    
+    def _cache_key(self, processed_tokens, original_query, pattern_intent=None):
+        """Cache on the normalized tokens, or the cleaned text when every token was a stopword
+        
+        Product and pattern matches read the text, not the tokens, so they are resolved
+        before the cache; the pattern intent is part of the key for the rare pattern
+        intent without an FAQ answer, whose queries skip the similarity scores.
+        """
+        if processed_tokens:
+            return (pattern_intent, tuple(processed_tokens))
+        return (pattern_intent, "", original_query)
+    
+    def _cache_resolution(self, cache_key, resolution):
+        """Cache a resolution, except rule-based fallbacks so the next ask retries OpenAI"""
+        if resolution["source"] != "fallback":
+            self.response_cache.set(cache_key, resolution)
+    
+    def stream_query(self, user_query):
+        """Yield the reply in chunks: product and FAQ answers at once, OpenAI answers as they generate"""
+        start = time.perf_counter()
         if not user_query or not user_query.strip():
-            return "Please ask me a question about Nike sneakers and I'll be happy to help!"
+            self._record(EMPTY_QUERY_RESOLUTION, False, start)
+            yield EMPTY_QUERY_RESOLUTION["answer"]
+            return
+        
+        query_logger.debug("Streaming query: %s", user_query)
         
-        print(f"Processing query: {user_query}")
+        with stage("nlp"):
+            processed_tokens, original_query = self.nlp.process_query(user_query)
         
+        resolution, pattern_intent = self.resolve_match(user_query, original_query)
+        cached = False
+        confidence = PATTERN_CONFIDENCE if pattern_intent else 0.0
+        if resolution is None:
+            cache_key = self._cache_key(processed_tokens, original_query, pattern_intent)
+            resolution = self.response_cache.get(cache_key)
+            cached = resolution is not None
+            if resolution is None and not pattern_intent:
+                predicted_intent, confidence = self.classifier.predict_processed(
+                    processed_tokens, original_query, patterns=False
+                )
+                resolution = self.resolve_intent(predicted_intent, confidence)
+                if resolution is not None:
+                    self._cache_resolution(cache_key, resolution)
+        
+        if resolution is not None:
+            self._record(resolution, cached, start)
+            yield self.render_response(resolution)
+            return
+        
+        # Stream the OpenAI answer, caching it only if it arrived in full
+        chunks = []
+        stream_start = time.perf_counter()
+        try:
+            for chunk in self.llm.stream(user_query):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            query_logger.warning("OpenAI API Error: %s", e)
+            if not chunks:
+                yield self.get_fallback_response(user_query)
+            return
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - stream_start, stage="openai_stream")
+            self._record({"source": "openai" if chunks else "fallback"}, False, start)
+        
+        if chunks:
+            self._cache_resolution(cache_key, self.resolve_openai(user_query, "".join(chunks).strip(), confidence))
+        else:
+            yield self.get_fallback_response(user_query)
+    
+    def resolve_match(self, user_query, original_query):
+        """(resolution or None, pattern intent or None) from a product mention or an intent pattern"""
         # Step 1: Check for specific product mentions
-        product_name, product_details = self.check_product_mention(user_query)
-        if product_name and product_details:
-            return self.format_product_response(product_name, product_details)
+        resolution = self.resolve_product(user_query, original_query)
+        if resolution is not None:
+            return resolution, None
         
-        # Step 2: Use ML intent classification
-        predicted_intent, confidence = self.classifier.predict_intent(user_query)
+        # Step 2: Check the intent patterns
+        pattern_intent = self.classifier.match_patterns(original_query)
+        return self.resolve_intent(pattern_intent, PATTERN_CONFIDENCE), pattern_intent
+    
+    def resolve_query(self, user_query, processed_tokens, original_query, pattern_intent=None):
+        """Answer a query resolve_match() left open, without picking the FAQ response variant"""
+        # Step 3: Use ML intent classification, unless a pattern already named an intent without an FAQ answer
+        confidence = PATTERN_CONFIDENCE
+        if not pattern_intent:
+            predicted_intent, confidence = self.classifier.predict_processed(
+                processed_tokens, original_query, patterns=False
+            )
+            resolution = self.resolve_intent(predicted_intent, confidence)
+            if resolution is not None:
+                return resolution
         
-        print(f"Predicted intent: {predicted_intent}, Confidence: {confidence:.3f}")
+        # Step 4: Fallback to OpenAI or rule-based response
+        return self.resolve_openai(user_query, self.ask_openai(user_query), confidence)
+    
+    def resolve_product(self, user_query, cleaned_query=None):
+        """Resolution for a query naming a catalog product, or None
         
-        if predicted_intent and confidence >= self.confidence_threshold:
-            # High confidence - return FAQ response
-            faq_response = self.get_faq_response(predicted_intent)
-            if faq_response:
-                return f"**Nike Customer Support:** {faq_response}"
+        The cleaned (and spelling-corrected) query is tried when the raw one names
+        no product, so "jordn 1" still finds the Air Jordan 1.
+        """
+        with stage("product_match"):
+            product_name, product_details = self.check_product_mention(user_query)
+            if product_name is None and cleaned_query:
+                product_name, product_details = self.check_product_mention(cleaned_query)
+        if product_name and product_details:
+            return {"source": "product", "intent": "products", "confidence": 1.0,
+                    "product": product_name, "details": product_details}
+        return None
+    
+    def resolve_intent(self, predicted_intent, confidence):
+        """Resolution for a confident FAQ intent, or None if OpenAI is needed"""
+        query_logger.debug("Predicted intent: %s, Confidence: %.3f", predicted_intent, confidence)
         
-        # Step 3: Fallback to OpenAI or rule-based response
-        return self.get_openai_response(user_query)
+        if predicted_intent and confidence >= self.confidence_threshold and predicted_intent in self.knowledge.faq_data:
+            # High confidence - answer from the FAQ
+            return {"source": "faq", "intent": predicted_intent, "confidence": float(confidence)}
+        return None
+    
+    def resolve_openai(self, user_query, answer, confidence):
+        """Resolution for an OpenAI answer, or the rule-based fallback if there was none"""
+        if answer:
+            return {"source": "openai", "intent": None, "confidence": float(confidence), "answer": answer}
+        return {"source": "fallback", "intent": None, "confidence": float(confidence),
+                "answer": self.get_fallback_response(user_query)}
+    
+    def describe_resolution(self, resolution):
+        """Response text plus the intent, confidence and source behind it"""
+        return {
+            "response": self.render_response(resolution),
+            "intent": resolution["intent"],
+            "confidence": resolution["confidence"],
+            "source": resolution["source"]
+        }
+    
+    def render_response(self, resolution):
+        """Turn a resolution into the reply text, choosing a fresh FAQ variant each call"""
+        if resolution["source"] == "product":
+            return self.format_product_response(resolution["product"], resolution["details"])
+        if resolution["source"] == "faq":
+            return f"**Nike Customer Support:** {self.get_faq_response(resolution['intent'])}"
+        return resolution["answer"]
     
     def check_product_mention(self, query):
         """Check if query mentions specific Nike products"""
-        query_lower = query.lower()
-        for product_name, details in NIKE_PRODUCTS.items():
-            if product_name.lower() in query_lower:
-                return product_name, details
-        
-        # Check for common product keywords
-        product_keywords = {
-            'air max': 'Air Max 270',
-            'jordan': 'Air Jordan 1 Retro High',
-            'react': 'React Element 55',
-            'pegasus': 'Zoom Pegasus 39',
-            'dunk': 'Dunk Low'
-        }
-        
-        for keyword, product_name in product_keywords.items():
-            if keyword in query_lower:
-                return product_name, NIKE_PRODUCTS[product_name]
-        
-        return None, None
+        return self.product_matcher.match(query)
     
     def format_product_response(self, product_name, product_details):
         """Format product information response"""
@@ -80,26 +341,20 @@ Would you like more information about this product or help with sizing?"""
     
     def get_faq_response(self, intent):
         """Get a random response from FAQ category"""
-        if intent in FAQ_DATA:
-            return random.choice(FAQ_DATA[intent]['responses'])
-        return None
+        with stage("faq_lookup"):
+            faq_data = self.knowledge.faq_data
+            if intent in faq_data:
+                return random.choice(faq_data[intent]['responses'])
+            return None
+    
+    def ask_openai(self, query):
+        """Ask OpenAI for an answer, returning None if the call fails or times out"""
+        with stage("openai"):
+            return self.llm.ask(query)
     
     def get_openai_response(self, query):
         """Get response from OpenAI when intent classification fails"""
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a knowledgeable Nike sneaker store assistant. Provide helpful, accurate information about Nike products, sizing, shipping, returns, and general customer service. Keep responses under 150 words and be friendly and professional."},
-                    {"role": "user", "content": query}
-                ],
-                max_tokens=150,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"OpenAI API Error: {e}")
-            return self.get_fallback_response(query)
+        return self.ask_openai(query) or self.get_fallback_response(query)
     
     def get_fallback_response(self, query):
         """Provide fallback responses when OpenAI is unavailable"""
@@ -121,4 +376,11 @@ Would you like more information about this product or help with sizing?"""
     
     def get_training_stats(self):
         """Get training statistics"""
-        return self.classifier.get_training_stats()
\ No newline at end of file
+        return self.classifier.get_training_stats()
+    
+    def get_cache_stats(self):
+        """Get response and NLP cache hit/miss counters"""
+        return {
+            "responses": self.response_cache.stats(),
+            "nlp": self.nlp.cache_stats()
+        }
\ No newline at end of file
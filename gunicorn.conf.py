@@ -0,0 +1,36 @@
+"""
+Gunicorn settings for Nike Customer Support Chatbot
+Run with: gunicorn -c gunicorn.conf.py app:app
+"""
+
+import gc
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+# Each worker is its own process, so with more than one, conversation history must live
+# in a store they share: default to sqlite here and refuse the per-process memory store
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+os.environ.setdefault('CONVERSATION_STORE', 'sqlite')
+if workers > 1 and os.environ['CONVERSATION_STORE'] == 'memory':
+    raise RuntimeError(
+        f"CONVERSATION_STORE=memory keeps history per process and would lose it across "
+        f"{workers} workers; use CONVERSATION_STORE=sqlite or GUNICORN_WORKERS=1"
+    )
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+
+# Import app.py once in the master: NLTK data, NLP tables, the intent classifier
+# and the matchers are built a single time and inherited by every worker
+preload_app = True
+
+def when_ready(server):
+    """Runs in the master after the app is loaded, just before workers fork"""
+    # Move everything loaded so far out of the collector's reach, so GC passes in
+    # the workers do not write to (and un-share) the pages holding those objects
+    gc.freeze()
+    server.log.info("Froze %d preloaded objects before forking", gc.get_freeze_count())
+
+def post_fork(server, worker):
+    """Runs in each worker right after it forks"""
+    import app
+    app.start_background_tasks()
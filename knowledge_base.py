@@ -0,0 +1,178 @@
+"""
+Hot-reloadable knowledge base for Nike Customer Support Chatbot
+Loads FAQ_DATA, NIKE_PRODUCTS and training data from a JSON or YAML file and
+watches it for changes, so catalog and policy edits need no redeploy
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+from data import FAQ_DATA, NIKE_PRODUCTS, PRODUCT_ALIASES
+from matchers import FAQKeywordIndex, ProductMatcher
+from metrics import BACKGROUND_ERRORS, background_logger
+from training_data import TRAINING_DATA, INTENT_PATTERNS
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Knowledge base file to load at startup and watch; unset keeps the built-in data
+KNOWLEDGE_BASE_PATH = os.getenv('KNOWLEDGE_BASE_PATH')
+
+# Sections a knowledge base file may contain; any section left out keeps the built-in value
+KNOWLEDGE_SECTIONS = ('faq_data', 'products', 'product_aliases', 'training_data', 'intent_patterns')
+
+class KnowledgeBase:
+    """One version of the knowledge base and the matchers built from it; never modified in place"""
+
+    def __init__(self, faq_data=FAQ_DATA, products=NIKE_PRODUCTS, product_aliases=PRODUCT_ALIASES,
+                 training_data=TRAINING_DATA, intent_patterns=INTENT_PATTERNS, source=None, mtime=None):
+        self.faq_data = faq_data
+        self.products = products
+        self.product_aliases = product_aliases
+        self.training_data = training_data
+        self.intent_patterns = intent_patterns
+        # File this version was read from and its modification time, if any
+        self.source = source
+        self.mtime = mtime
+
+        self.product_matcher = ProductMatcher(products, product_aliases)
+        self.faq_index = FAQKeywordIndex(faq_data)
+
+    def sections(self):
+        return {section: getattr(self, section) for section in KNOWLEDGE_SECTIONS}
+
+def file_mtime(path):
+    """Modification time in nanoseconds, used to detect edits"""
+    return os.stat(path).st_mtime_ns
+
+def read_knowledge_file(path):
+    """Parse a .json, .yaml or .yml knowledge base file into a dict of sections"""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, encoding='utf-8') as f:
+        if extension in ('.yaml', '.yml'):
+            if yaml is None:
+                raise ValueError(f"Reading {path} needs PyYAML: pip install pyyaml")
+            data = yaml.safe_load(f)
+        elif extension == '.json':
+            data = json.load(f)
+        else:
+            raise ValueError(f"Unsupported knowledge base file '{path}', expected .json, .yaml or .yml")
+
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} must contain a mapping of sections")
+
+    unknown = set(data) - set(KNOWLEDGE_SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown sections in {path}: {', '.join(sorted(unknown))}")
+
+    validate_sections(data)
+    return data
+
+def validate_sections(data):
+    """Check the shape of each section so a bad edit is rejected before it goes live"""
+    for category, entry in data.get('faq_data', {}).items():
+        if not entry.get('keywords') or not entry.get('responses'):
+            raise ValueError(f"FAQ category '{category}' needs non-empty 'keywords' and 'responses'")
+
+    for name, details in data.get('products', {}).items():
+        missing = {'price', 'description', 'sizes', 'colors'} - set(details)
+        if missing:
+            raise ValueError(f"Product '{name}' is missing {', '.join(sorted(missing))}")
+
+    for example in data.get('training_data', []):
+        if 'query' not in example or 'intent' not in example:
+            raise ValueError(f"Training example {example!r} needs 'query' and 'intent'")
+
+    for intent, patterns in data.get('intent_patterns', {}).items():
+        if not isinstance(patterns, list) or not patterns:
+            raise ValueError(f"Patterns for intent '{intent}' must be a non-empty list")
+        for pattern in patterns:
+            try:
+                re.compile(pattern)
+            except (re.error, TypeError) as e:
+                raise ValueError(f"Invalid pattern {pattern!r} for intent '{intent}': {e}")
+
+def load_knowledge_base(path=None):
+    """Build a KnowledgeBase from a file, or from the built-in data when path is None"""
+    if path is None:
+        return KnowledgeBase()
+
+    mtime = file_mtime(path)
+    sections = read_knowledge_file(path)
+    return KnowledgeBase(**sections, source=path, mtime=mtime)
+
+def export_knowledge_base(path, knowledge=None):
+    """Write the built-in (or given) knowledge base to a JSON or YAML file to start editing from"""
+    sections = (knowledge or KnowledgeBase()).sections()
+    with open(path, 'w', encoding='utf-8') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ValueError(f"Writing {path} needs PyYAML: pip install pyyaml")
+            yaml.safe_dump(sections, f, sort_keys=False, allow_unicode=True)
+        else:
+            json.dump(sections, f, indent=2, ensure_ascii=False)
+
+class KnowledgeBaseWatcher:
+    """Polls a knowledge base file's mtime and hands each new version to on_change"""
+
+    def __init__(self, path, on_change, interval=5.0, mtime=None):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.mtime = mtime
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Reload if the file changed since the last load; returns True if a new version went live"""
+        try:
+            mtime = file_mtime(self.path)
+        except OSError as e:
+            background_logger.warning("Could not stat knowledge base %s: %s", self.path, e)
+            BACKGROUND_ERRORS.inc(task="knowledge_reload")
+            return False
+
+        if mtime == self.mtime:
+            return False
+
+        try:
+            knowledge = load_knowledge_base(self.path)
+            self.on_change(knowledge)
+        except Exception as e:
+            # Keep serving the previous version; retry only after the file changes again
+            background_logger.error("Could not reload knowledge base from %s: %s", self.path, e)
+            BACKGROUND_ERRORS.inc(task="knowledge_reload")
+            self.mtime = mtime
+            return False
+
+        self.mtime = knowledge.mtime
+        background_logger.info("Reloaded knowledge base from %s", self.path)
+        return True
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def run():
+            while not self._stop.wait(self.interval):
+                self.check()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="knowledge-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python knowledge_base.py <output.json|output.yaml>")
+    export_knowledge_base(sys.argv[1])
+    print(f"✓ Wrote the built-in knowledge base to {sys.argv[1]}")
@@ -0,0 +1,175 @@
+"""
+Multi-pattern text matchers for Nike Customer Support Chatbot
+Aho-Corasick automaton, the product-mention detector and the FAQ keyword
+index built on it
+"""
+
+from collections import deque
+
+class AhoCorasick:
+    """Finds every occurrence of many patterns in a single pass over the text"""
+    
+    def __init__(self, patterns):
+        # Trie of goto transitions, failure links and per-state outputs
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        
+        for pattern, value in patterns:
+            self._add(pattern, value)
+        self._build_failure_links()
+    
+    def _add(self, pattern, value):
+        """Insert a pattern into the trie"""
+        if not pattern:
+            return
+        
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append((len(pattern), value))
+    
+    def _build_failure_links(self):
+        """Breadth-first pass linking each state to its longest proper suffix state"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                
+                # Inherit matches that end at the same position via the failure link
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+    
+    def iter_matches(self, text):
+        """Yield (start, end, value) for every pattern occurrence in text"""
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            
+            for length, value in self.output[state]:
+                yield i + 1 - length, i + 1, value
+
+class ProductMatcher:
+    """Detects product mentions by name, spacing variant or alias, longest match wins"""
+    
+    def __init__(self, products, aliases=None):
+        self.products = products
+        
+        # Full names and their spacing variants are registered before aliases,
+        # so a variant claimed by both resolves to the full product name
+        variants = {}
+        for product_name in products:
+            name = product_name.lower()
+            for variant in (name, name.replace(' ', ''), name.replace(' ', '-')):
+                variants.setdefault(variant, product_name)
+        
+        for alias, product_name in (aliases or {}).items():
+            if product_name in products:
+                variants.setdefault(alias.lower(), product_name)
+        
+        self.automaton = AhoCorasick(variants.items())
+    
+    @staticmethod
+    def _at_word_boundary(text, start, end):
+        """True if text[start:end] is a whole word, allowing a trailing plural 's'"""
+        if start > 0 and text[start - 1].isalnum():
+            return False
+        if end < len(text) and text[end].isalnum():
+            return text[end] == 's' and (end + 1 == len(text) or not text[end + 1].isalnum())
+        return True
+    
+    def match(self, query):
+        """Return (product_name, details) for the longest product mention, or (None, None)"""
+        text = query.lower()
+        best_key = None
+        best_product = None
+        
+        for start, end, product_name in self.automaton.iter_matches(text):
+            if not self._at_word_boundary(text, start, end):
+                continue
+            
+            # Longest mention wins, ties go to the earliest one
+            key = (end - start, -start)
+            if best_key is None or key > best_key:
+                best_key = key
+                best_product = product_name
+        
+        if best_product is None:
+            return None, None
+        return best_product, self.products[best_product]
+
+class FAQKeywordIndex:
+    """Precomputed keyword index that scores FAQ categories like NikeChatbot.find_best_match"""
+    
+    def __init__(self, faq_data):
+        self.categories = list(faq_data)
+        
+        # Every substring of every keyword, for tokens contained in a keyword
+        self.substring_categories = {}
+        # Keyword -> category indices, once per listing, for the exact-phrase boost
+        self.keyword_categories = {}
+        
+        for idx, data in enumerate(faq_data.values()):
+            for keyword in data['keywords']:
+                keyword = keyword.lower()
+                self.keyword_categories.setdefault(keyword, []).append(idx)
+                for start in range(len(keyword)):
+                    for end in range(start + 1, len(keyword) + 1):
+                        self.substring_categories.setdefault(keyword[start:end], set()).add(idx)
+        
+        # Finds keywords contained in a token, and keywords present in the whole query
+        self.automaton = AhoCorasick((keyword, keyword) for keyword in self.keyword_categories)
+    
+    def token_categories(self, token):
+        """Categories with a keyword that contains token or is contained in it"""
+        token = token.lower()
+        categories = set(self.substring_categories.get(token, ()))
+        for _, _, keyword in self.automaton.iter_matches(token):
+            categories.update(self.keyword_categories[keyword])
+        return categories
+    
+    def best_match(self, query_tokens, original_query):
+        """Return (category, score) for the best scoring FAQ category"""
+        keyword_matches = [0] * len(self.categories)
+        for token in query_tokens:
+            for idx in self.token_categories(token):
+                keyword_matches[idx] += 1
+        
+        # Boost once per listed keyword that appears anywhere in the query
+        boosts = [0] * len(self.categories)
+        found_keywords = {keyword for _, _, keyword in self.automaton.iter_matches(original_query.lower())}
+        for keyword in found_keywords:
+            for idx in self.keyword_categories[keyword]:
+                boosts[idx] += 1
+        
+        best_match = None
+        best_score = 0
+        for idx, category in enumerate(self.categories):
+            if len(query_tokens) > 0:
+                score = keyword_matches[idx] / len(query_tokens)
+            else:
+                score = 0
+            
+            # Added one at a time so the float result matches the original loop exactly
+            for _ in range(boosts[idx]):
+                score += 0.3
+            
+            if score > best_score:
+                best_score = score
+                best_match = category
+        
+        return best_match, best_score
@@ -0,0 +1,245 @@
+"""
+Metrics and sampled logging for Nike Customer Support Chatbot
+Thread-safe counters and histograms rendered in the Prometheus text format,
+per-stage timing spans for the query pipeline, a logging filter that
+passes only a fraction of per-query debug/info records, and the logger and
+counter for failures in background work
+"""
+
+import bisect
+import logging
+import os
+import random
+import threading
+import time
+
+# Bucket upper bounds in seconds, from sub-millisecond NLP stages up to slow OpenAI calls
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Base for a named metric with a fixed set of label names"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        try:
+            return tuple([labels[name] for name in self.labelnames])
+        except KeyError:
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}") from None
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    """Monotonically increasing count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values
+        ]
+
+class _Timer:
+    """Context manager observing the wall time of its block into a histogram child"""
+
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.start)
+
+class _HistogramChild:
+    """Bucket counts and sum for one label set"""
+
+    __slots__ = ("buckets", "counts", "total", "lock")
+
+    def __init__(self, buckets, lock):
+        self.buckets = buckets
+        # One count per bucket, the last one for +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.lock = lock
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.total += value
+
+    def time(self):
+        return _Timer(self)
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children = {}
+
+    def labels(self, **labels):
+        """The child for one label set; hot paths bind it once instead of passing labels per call"""
+        key = self._key(labels)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, _HistogramChild(self.buckets, self._lock))
+        return child
+
+    def observe(self, value, **labels):
+        self.labels(**labels).observe(value)
+
+    def time(self, **labels):
+        """Observe the wall time of the with-block"""
+        return self.labels(**labels).time()
+
+    def count(self, **labels):
+        return sum(self.labels(**labels).counts)
+
+    def render(self):
+        with self._lock:
+            values = sorted((key, (list(child.counts), child.total)) for key, child in self._children.items())
+
+        lines = self.header()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class CallbackMetric(Metric):
+    """Metric whose samples are read from a callback at scrape time, e.g. existing cache stats"""
+
+    def __init__(self, name, documentation, kind, labelnames, callback):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def render(self):
+        samples = self.callback()
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(samples.items())
+        ]
+
+class MetricsRegistry:
+    """Collects metrics and renders them for a /metrics scrape"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Metrics are per process; with several workers each one serves its own /metrics
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "chatbot_stage_seconds",
+    "Time spent in each query pipeline stage",
+    ["stage"]
+))
+REQUEST_SECONDS = registry.register(Histogram(
+    "chatbot_request_seconds",
+    "End-to-end time to answer a query, by resolution path",
+    ["source"]
+))
+REQUESTS_TOTAL = registry.register(Counter(
+    "chatbot_requests_total",
+    "Queries answered, by resolution path and whether the response cache hit",
+    ["source", "cached"]
+))
+BACKGROUND_ERRORS = registry.register(Counter(
+    "chatbot_background_errors_total",
+    "Failures outside a request: knowledge base reloads, classifier refits, model loads and saves",
+    ["task"]
+))
+
+_stage_children = {}
+
+def stage(name):
+    """Timing span for one pipeline stage: `with stage('nlp'): ...`"""
+    child = _stage_children.get(name)
+    if child is None:
+        child = _stage_children[name] = STAGE_SECONDS.labels(stage=name)
+    return _Timer(child)
+
+class SamplingFilter(logging.Filter):
+    """Pass every WARNING and above, and only `rate` of lower-level records"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+# Per-query log lines; DEBUG by default, so they cost nothing unless enabled,
+# and sampled at LOG_SAMPLE_RATE (default 1%) when they are
+query_logger = logging.getLogger("chatbot.queries")
+query_logger.addFilter(SamplingFilter(float(os.getenv('LOG_SAMPLE_RATE', '0.01'))))
+
+# Reloads, refits and model files: progress at INFO, failures at WARNING and above, also counted in BACKGROUND_ERRORS
+background_logger = logging.getLogger("chatbot.background")
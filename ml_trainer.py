@@ -1,105 +1,844 @@
 """
 Machine Learning trainer for Nike Customer Support Chatbot
-Implements TF-IDF and similarity-based intent classification
+Implements TF-IDF intent classification behind a common engine interface:
+nearest-neighbor similarity (knn) or a linear model over the same features (linear)
 """
 
+import os
 import re
+import hashlib
+import json
+import threading
+import joblib
 import numpy as np
+import sklearn
+from scipy import sparse
 from collections import Counter
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.cluster import KMeans
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from data import FAQ_DATA
+from metrics import BACKGROUND_ERRORS, background_logger, stage
 from training_data import TRAINING_DATA, INTENT_PATTERNS
 from nlp_processor import NLPProcessor
 
-class IntentClassifier:
-    def __init__(self):
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_PATH = os.getenv(
+    'INTENT_MODEL_PATH',
+    os.path.join(BASE_DIR, 'models', 'intent_classifier.joblib')
+)
+
+# Bump when the layout of the saved artifact changes
+MODEL_FORMAT_VERSION = 2
+
+# Confidence reported for an intent found by its regex patterns
+PATTERN_CONFIDENCE = 0.9
+
+def training_data_hash(training_data=TRAINING_DATA):
+    """Hash the training examples so saved models can be matched to them"""
+    payload = json.dumps(training_data, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+# Group references, conditionals and named groups, which would point at the wrong
+# group (or clash) once a pattern is wrapped in the combined regex. Escaped
+# backslashes are matched first, so a literal backslash before a digit is not a reference
+GROUP_REFERENCE_RE = re.compile(r'\\\\|\\[1-9]|\(\?\(|\(\?P[<=]')
+
+# Flags of a pattern without inline global flags such as (?i)
+DEFAULT_REGEX_FLAGS = re.compile('').flags
+
+class IntentPatternMatcher:
+    """INTENT_PATTERNS compiled into a single regex with one named group per intent
+    
+    Patterns that cannot be merged without changing their meaning (group
+    references or inline global flags) are searched separately. Intents with no
+    patterns are left out; an empty group would match every query.
+    """
+    
+    def __init__(self, intent_patterns):
+        self.intents = []
+        # (rank, pattern, compiled pattern, mergeable) in priority order
+        entries = []
+        for intent, patterns in intent_patterns.items():
+            if not patterns:
+                continue
+            rank = len(self.intents)
+            self.intents.append(intent)
+            for pattern in patterns:
+                try:
+                    compiled = re.compile(pattern)
+                except re.error as e:
+                    raise ValueError(f"Invalid pattern {pattern!r} for intent '{intent}': {e}") from e
+                entries.append((rank, pattern, compiled, self._mergeable(pattern, compiled)))
+        
+        try:
+            self.regex = self._combine([(rank, pattern) for rank, pattern, _, mergeable in entries if mergeable])
+            self.separate = [(rank, compiled) for rank, _, compiled, mergeable in entries if not mergeable]
+        except re.error:
+            # Should not happen after the checks above, but never let merging break matching
+            self.regex = None
+            self.separate = [(rank, compiled) for rank, _, compiled, _ in entries]
+    
+    @staticmethod
+    def _mergeable(pattern, compiled):
+        """True if pattern means the same inside the combined regex"""
+        if compiled.flags != DEFAULT_REGEX_FLAGS:
+            return False
+        return all(match.group() == '\\\\' for match in GROUP_REFERENCE_RE.finditer(pattern))
+    
+    def _combine(self, ranked_patterns):
+        """One regex with a named group per intent, or None if there is nothing to merge"""
+        alternatives = {}
+        for rank, pattern in ranked_patterns:
+            alternatives.setdefault(rank, []).append(f"(?:{self._strip_wildcards(pattern)})")
+        if not alternatives:
+            return None
+        
+        groups = [f"(?P<intent_{rank}>{'|'.join(patterns)})" for rank, patterns in alternatives.items()]
+        # The lookahead makes every match zero-width, so a lower-priority match
+        # never consumes text that a higher-priority pattern could start in
+        return re.compile("(?=" + "|".join(groups) + ")")
+    
+    @staticmethod
+    def _strip_wildcards(pattern):
+        """Drop leading and trailing '.*', which re.search makes redundant"""
+        pattern = re.sub(r'^(?:\.\*)+', '', pattern)
+        return re.sub(r'(?<!\\)(?:\.\*)+$', '', pattern)
+    
+    def match(self, query):
+        """Return the first intent, in INTENT_PATTERNS order, with a matching pattern"""
+        best_rank = None
+        if self.regex is not None:
+            for match in self.regex.finditer(query):
+                rank = int(match.lastgroup[len("intent_"):])
+                if best_rank is None or rank < best_rank:
+                    best_rank = rank
+                    if rank == 0:
+                        break
+        
+        # Separately searched patterns only matter if they outrank the merged match
+        for rank, compiled in self.separate:
+            if best_rank is not None and rank >= best_rank:
+                break
+            if compiled.search(query):
+                best_rank = rank
+                break
+        
+        return self.intents[best_rank] if best_rank is not None else None
+
+# How predict_intent searches the training set:
+#   exhaustive - cosine against every training example (original behaviour)
+#   centroid   - cosine against one mean vector per intent
+#   prototype  - cosine against up to k k-means prototypes per intent
+INDEX_MODES = ('exhaustive', 'centroid', 'prototype')
+
+# How queries become vectors:
+#   tfidf   - TfidfVectorizer with a fitted vocabulary (original behaviour); examples
+#             added later are projected onto that vocabulary, new terms are dropped
+#   hashing - HashingVectorizer + TF-IDF weights, so new terms from added examples
+#             get their own columns without refitting
+VECTORIZER_TYPES = ('tfidf', 'hashing')
+
+# What scores a query vector against the training data:
+#   knn       - IntentClassifier, cosine nearest neighbors in one of the INDEX_MODES
+#   linear    - LinearIntentClassifier, one weight row per intent from a logistic
+#               regression, so inference cost does not grow with the training set
+#   embedding - EmbeddingIntentClassifier (embedding_engine.py), dense sentence
+#               vectors searched through an in-process approximate nearest-neighbor index
+INTENT_ENGINES = ('knn', 'linear', 'embedding')
+
+class IntentModel:
+    """One fitted version of the classifier; replaced as a whole, never modified in place"""
+    
+    def __init__(self, vectorizer, training_vectors, training_intents, pattern_matcher,
+                 intent_vectors=None, intent_bias=None, index=None):
+        self.vectorizer = vectorizer
+        self.pattern_matcher = pattern_matcher
+        self.training_vectors = training_vectors
+        self.training_intents = tuple(training_intents)
+        # intent -> rows of index vectors (knn prototypes, or linear weights), kept so
+        # adding examples only rebuilds the touched intents
+        self.intent_vectors = intent_vectors
+        # intent -> bias added to each of its rows' scores (linear engine only)
+        self.intent_bias = intent_bias
+        # Engine-specific search structure (the embedding engine's ANN index)
+        self.index = index
+        
+        if intent_vectors:
+            self.index_vectors = np.vstack(list(intent_vectors.values()))
+            self.index_intents = tuple(
+                intent for intent, vectors in intent_vectors.items() for _ in range(vectors.shape[0])
+            )
+            self.index_bias = np.array([intent_bias[intent] for intent in self.index_intents]) if intent_bias else None
+        else:
+            self.index_vectors = None
+            self.index_intents = None
+            self.index_bias = None
+
+# Concurrency model: one intent engine is shared by every request thread.
+#   - All fitted state lives in an IntentModel that is never modified after it is
+#     built. self.model is the only mutable reference, and rebinding it is atomic,
+#     so readers need no lock: each prediction reads self.model once and uses that
+#     snapshot throughout, even if a refit publishes a newer one meanwhile.
+#   - Writers build a complete new IntentModel and publish it with one assignment.
+#     _refit_lock makes full fits single-flight: a first-request race trains once,
+#     and an older refit can never replace a newer one. _write_lock only covers
+#     the short publish step and add_examples(), so writers never block readers.
+#   - The vectorizer, training_vectors, training_intents and pattern_matcher
+#     properties each read the current snapshot separately. Use self.model when
+#     several of them must come from the same version.
+class IntentEngine:
+    """Pattern matching plus TF-IDF scoring, with the scoring step supplied by a subclass
+    
+    Every engine offers the same interface: fit() trains and publishes a model,
+    predict() and predict_batch() return (intent or None, score) per query, and
+    save() / load() persist the fitted model. Subclasses implement _build_index
+    (the fitted per-intent state), _score (query vectors -> best intents and
+    scores) and engine_config (the settings a saved artifact must match).
+    """
+    
+    engine = None
+    # Whether fits also learn from the FAQ_DATA keywords in self.faq_data
+    learns_faq_keywords = False
+    
+    def __init__(self, vectorizer='tfidf', hash_features=2 ** 14):
+        if vectorizer not in VECTORIZER_TYPES:
+            raise ValueError(f"Unknown vectorizer '{vectorizer}', expected one of {VECTORIZER_TYPES}")
+        
         self.nlp = NLPProcessor()
-        self.vectorizer = TfidfVectorizer(
+        self.vectorizer_type = vectorizer
+        self.hash_features = hash_features
+        # Base examples and patterns; replaced by refit() when the knowledge base is reloaded
+        self.training_data = TRAINING_DATA
+        self.intent_patterns = INTENT_PATTERNS
+        self.faq_data = FAQ_DATA
+        
+        # The current IntentModel; predictions read it once, refits swap it in one assignment
+        self.model = None
+        # Hash of the base training data the live model was built from
+        self.model_data_hash = None
+        # Labeled examples added at runtime with add_examples(); not saved with the artifact
+        self.extra_examples = []
+        self._examples_since_fit = 0
+        self._write_lock = threading.Lock()
+        # Serializes full fits, so an older refit can never swap in after a newer one
+        self._refit_lock = threading.RLock()
+        self._refit_thread = None
+        self._refit_stop = threading.Event()
+    
+    @property
+    def is_trained(self):
+        return self.model is not None
+    
+    @property
+    def vectorizer(self):
+        return self.model.vectorizer if self.model else None
+    
+    @property
+    def training_vectors(self):
+        return self.model.training_vectors if self.model else None
+    
+    @property
+    def training_intents(self):
+        return list(self.model.training_intents) if self.model else None
+    
+    @property
+    def pattern_matcher(self):
+        return self.model.pattern_matcher if self.model else None
+    
+    def _new_vectorizer(self):
+        """An unfitted vectorizer of the configured type"""
+        if self.vectorizer_type == 'hashing':
+            return make_pipeline(
+                HashingVectorizer(
+                    n_features=self.hash_features,
+                    stop_words='english',
+                    ngram_range=(1, 2),
+                    alternate_sign=False,
+                    norm=None
+                ),
+                TfidfTransformer()
+            )
+        
+        return TfidfVectorizer(
             max_features=1000,
             stop_words='english',
             ngram_range=(1, 2)
         )
-        self.training_vectors = None
-        self.training_intents = None
-        self.is_trained = False
+    
+    def _process_examples(self, examples):
+        """NLP-process {'query', 'intent'} examples into (processed queries, intents)"""
+        processed_queries = []
+        intents = []
+        for example in examples:
+            processed_tokens, original_query = self.nlp.process_query(example["query"])
+            processed_queries.append(self._query_text(processed_tokens, original_query))
+            intents.append(example["intent"])
+        return processed_queries, intents
+    
+    def _query_text(self, processed_tokens, original_query):
+        """The text the vectorizer sees for one processed query"""
+        return " ".join(processed_tokens)
+    
+    @staticmethod
+    def _stack_rows(vectors, new_vectors):
+        """Append rows to a sparse or dense training matrix"""
+        if sparse.issparse(vectors):
+            return sparse.vstack([vectors, new_vectors], format='csr')
+        return np.vstack([vectors, new_vectors])
+    
+    def _fit(self, examples, intent_patterns, faq_data=None):
+        """Fit a new vectorizer and index on examples and return them as an IntentModel
+        
+        faq_data is only read by engines that learn the FAQ keywords.
+        """
+        training_queries, training_intents = self._process_examples(examples)
+        
+        # Create TF-IDF vectors
+        vectorizer = self._new_vectorizer()
+        training_vectors = vectorizer.fit_transform(training_queries)
+        return self._build_model(vectorizer, training_vectors, training_intents, IntentPatternMatcher(intent_patterns))
+    
+    def _build_model(self, vectorizer, training_vectors, training_intents, pattern_matcher,
+                     previous=None, changed=None):
+        """Build the engine's index over training_vectors and wrap it all in an IntentModel
         
+        With previous (an IntentModel) and changed, only the intents in changed are rebuilt.
+        """
+        intent_vectors, intent_bias = self._build_index(
+            training_vectors, training_intents, previous.intent_vectors if previous else None, changed
+        )
+        return IntentModel(vectorizer, training_vectors, training_intents, pattern_matcher, intent_vectors, intent_bias)
+    
     def train(self):
         """Train the intent classifier using training data"""
         print("Training intent classifier...")
         
-        # Prepare training data
-        training_queries = []
-        training_intents = []
+        model = self.fit()
+        
+        print(f"✓ Trained on {len(model.training_intents)} examples")
+        print(f"✓ Vocabulary size: {self._vocabulary_size(model)}")
+    
+    def ensure_trained(self):
+        """Train if no model is live yet; concurrent callers wait for that single fit"""
+        if self.model is None:
+            with self._refit_lock:
+                if self.model is None:
+                    self.train()
+    
+    def add_examples(self, examples):
+        """Add labeled {'query', 'intent'} examples to the live model without a full refit
+        
+        Rows are appended to the training matrix under the current vectorizer and only
+        the index entries of the affected intents are rebuilt. The examples are kept
+        for the next full refit but are not written to the saved model artifact.
+        """
+        examples = [{"query": example["query"], "intent": example["intent"]} for example in examples]
+        if not examples:
+            return 0
+        
+        self.ensure_trained()
+        
+        processed_queries, intents = self._process_examples(examples)
         
-        for example in TRAINING_DATA:
-            # Process query with NLP
-            processed_tokens, _ = self.nlp.process_query(example["query"])
-            processed_query = " ".join(processed_tokens)
+        with self._write_lock:
+            model = self.model
+            new_vectors = model.vectorizer.transform(processed_queries)
+            training_vectors = self._stack_rows(model.training_vectors, new_vectors)
+            training_intents = model.training_intents + tuple(intents)
             
-            training_queries.append(processed_query)
-            training_intents.append(example["intent"])
+            self.model = self._build_model(
+                model.vectorizer, training_vectors, training_intents, model.pattern_matcher, model, set(intents)
+            )
+            self.extra_examples.extend(examples)
+            self._examples_since_fit += len(examples)
         
-        # Create TF-IDF vectors
-        self.training_vectors = self.vectorizer.fit_transform(training_queries)
-        self.training_intents = training_intents
-        self.is_trained = True
+        return len(examples)
+    
+    def refit(self, training_data=None, intent_patterns=None, faq_data=None):
+        """Refit from scratch on the base training data plus added examples, then swap the model in
         
-        print(f"✓ Trained on {len(training_queries)} examples")
-        print(f"✓ Vocabulary size: {len(self.vectorizer.vocabulary_)}")
+        Pass training_data, intent_patterns and faq_data to replace the base data, e.g.
+        from a reloaded knowledge base; they only replace the current ones if the fit
+        succeeds. The fit runs without holding the write lock, so
+        predictions and add_examples() carry on against the old model; examples added
+        meanwhile are replayed onto the new one before the swap.
+        """
+        model = self.fit(training_data, intent_patterns, faq_data)
+        background_logger.info("Refit intent classifier on %d examples", len(model.training_intents))
+    
+    def fit(self, training_data=None, intent_patterns=None, faq_data=None):
+        """Fit on training_data (default: the current base data) plus added examples and publish the model
         
-    def predict_intent(self, query, threshold=0.3):
-        """Predict intent for a given query"""
-        if not self.is_trained:
+        Concurrent fits run one at a time; returns the IntentModel that went live.
+        """
+        with self._refit_lock:
+            return self._refit(training_data, intent_patterns, faq_data)
+    
+    def _refit(self, training_data, intent_patterns, faq_data=None):
+        """Fit and publish a new model; the caller holds _refit_lock"""
+        if training_data is None:
+            training_data = self.training_data
+        if intent_patterns is None:
+            intent_patterns = self.intent_patterns
+        if faq_data is None:
+            faq_data = self.faq_data
+        
+        with self._write_lock:
+            examples = list(training_data) + self.extra_examples
+            seen = len(self.extra_examples)
+        
+        model = self._fit(examples, intent_patterns, faq_data)
+        
+        with self._write_lock:
+            late = self.extra_examples[seen:]
+            if late:
+                processed_queries, intents = self._process_examples(late)
+                training_vectors = self._stack_rows(
+                    model.training_vectors, model.vectorizer.transform(processed_queries)
+                )
+                training_intents = model.training_intents + tuple(intents)
+                model = self._build_model(
+                    model.vectorizer, training_vectors, training_intents, model.pattern_matcher, model, set(intents)
+                )
+            
+            self.model = model
+            self.model_data_hash = training_data_hash(training_data)
+            self.training_data = training_data
+            self.intent_patterns = intent_patterns
+            self.faq_data = faq_data
+            self._examples_since_fit = len(late)
+        
+        return model
+    
+    def start_background_refit(self, interval):
+        """Refit every interval seconds, when examples were added since the last fit"""
+        if self._refit_thread is not None and self._refit_thread.is_alive():
+            return
+        
+        def run():
+            while not self._refit_stop.wait(interval):
+                if not self._examples_since_fit:
+                    continue
+                try:
+                    self.refit()
+                except Exception:
+                    background_logger.exception("Background refit of intent classifier failed")
+                    BACKGROUND_ERRORS.inc(task="intent_refit")
+        
+        self._refit_stop.clear()
+        self._refit_thread = threading.Thread(target=run, name="intent-refit", daemon=True)
+        self._refit_thread.start()
+    
+    def stop_background_refit(self):
+        self._refit_stop.set()
+        if self._refit_thread is not None:
+            self._refit_thread.join()
+            self._refit_thread = None
+    
+    def save(self, path=DEFAULT_MODEL_PATH):
+        """Save the fitted vectorizer, training matrix and intent labels"""
+        model = self.model
+        if model is None:
+            raise ValueError("Cannot save an untrained classifier")
+        if self.extra_examples:
+            raise ValueError("Cannot save a classifier with runtime examples; the artifact holds training data only")
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        artifact = {
+            "format_version": MODEL_FORMAT_VERSION,
+            "sklearn_version": sklearn.__version__,
+            "data_hash": training_data_hash(self.training_data),
+            "nlp_mode": self.nlp.mode,
+            "nlp_resources": self.nlp.resource_state(),
+            "vectorizer_type": self.vectorizer_type,
+            "engine": self.engine_config(),
+            "vectorizer": model.vectorizer,
+            "training_vectors": model.training_vectors,
+            "training_intents": list(model.training_intents),
+            "intent_vectors": model.intent_vectors,
+            "intent_bias": model.intent_bias,
+            "index": model.index
+        }
+        
+        # Write to a temp file and rename so concurrent workers never see a partial artifact
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(artifact, tmp_path)
+        os.replace(tmp_path, path)
+        print(f"✓ Saved intent classifier to {path}")
+    
+    def load(self, path=DEFAULT_MODEL_PATH, mmap=True):
+        """Load a saved model if it matches the current training data"""
+        if not os.path.exists(path):
+            return False
+        
+        try:
+            # Memory-map the arrays so workers share pages instead of copying them
+            artifact = joblib.load(path, mmap_mode='r' if mmap else None)
+        except Exception as e:
+            background_logger.warning("Could not load intent classifier from %s: %s", path, e)
+            BACKGROUND_ERRORS.inc(task="intent_load")
+            return False
+        
+        if (artifact.get("format_version") != MODEL_FORMAT_VERSION
+                or artifact.get("sklearn_version") != sklearn.__version__
+                or artifact.get("data_hash") != training_data_hash(self.training_data)
+                or artifact.get("nlp_mode", "nltk") != self.nlp.mode
+                or artifact.get("nlp_resources") != self.nlp.resource_state()
+                or artifact.get("vectorizer_type", "tfidf") != self.vectorizer_type
+                or artifact.get("engine") != self.engine_config()):
+            background_logger.warning("Saved intent classifier at %s is stale, ignoring it", path)
+            return False
+        
+        model = IntentModel(
+            artifact["vectorizer"],
+            artifact["training_vectors"],
+            list(artifact["training_intents"]),
+            IntentPatternMatcher(self.intent_patterns),
+            artifact["intent_vectors"],
+            artifact["intent_bias"],
+            artifact.get("index")
+        )
+        with self._write_lock:
+            self.model = model
+            self.model_data_hash = artifact["data_hash"]
+        
+        print(f"✓ Loaded intent classifier from {path}")
+        return True
+    
+    def load_or_train(self, path=DEFAULT_MODEL_PATH):
+        """Warm-start from a saved model, retraining only when the data changed"""
+        with self._refit_lock:
+            # Another chatbot sharing this classifier may already have loaded it
+            if self.model is not None and self.model_data_hash == training_data_hash(self.training_data):
+                return
+            
+            if self.load(path):
+                return
+            
             self.train()
+            try:
+                self.save(path)
+            except (OSError, ValueError) as e:
+                background_logger.warning("Could not save intent classifier to %s: %s", path, e)
+                BACKGROUND_ERRORS.inc(task="intent_save")
+                return
+            
+            # Swap the freshly built arrays for memory-mapped ones, which forked workers share
+            self.load(path)
         
+    def engine_config(self):
+        """Settings a saved artifact must have been built with to be reused"""
+        raise NotImplementedError
+    
+    def _build_index(self, training_vectors, training_intents, previous=None, changed=None):
+        """Return (intent -> index rows, intent -> bias or None) fitted on training_vectors"""
+        raise NotImplementedError
+    
+    @staticmethod
+    def _vocabulary_size(model):
+        """Number of known terms, or hashed columns in use for the hashing vectorizer"""
+        if hasattr(model.vectorizer, 'vocabulary_'):
+            return len(model.vectorizer.vocabulary_)
+        return int(np.count_nonzero(model.training_vectors.getnnz(axis=0)))
+    
+    def vocabulary(self):
+        """Single-word terms of the fitted TF-IDF vocabulary; empty for vectorizers without one"""
+        model = self.model
+        terms = getattr(model.vectorizer, 'vocabulary_', None) if model is not None else None
+        return {term for term in terms or () if ' ' not in term}
+    
+    def _score(self, model, query_vectors, threshold):
+        """Return the best intent and its score for each row of query_vectors"""
+        raise NotImplementedError
+    
+    def predict(self, query, threshold=0.3):
+        """Engine interface: (intent or None, score) for one raw query"""
+        return self.predict_intent(query, threshold)
+    
+    def predict_batch(self, queries, threshold=0.3):
+        """Engine interface: arrays of intents (None below threshold) and scores for raw queries"""
+        return self.predict_intents(queries, threshold)
+    
+    def predict_intent(self, query, threshold=0.3):
+        """Predict intent for a given query"""
         # Process query
         processed_tokens, original_query = self.nlp.process_query(query)
-        processed_query = " ".join(processed_tokens)
+        return self.predict_processed(processed_tokens, original_query, threshold)
+    
+    def predict_processed(self, processed_tokens, original_query, threshold=0.3, patterns=True):
+        """Predict intent for a query already run through NLPProcessor.process_query
         
-        # Check pattern matching first
-        pattern_intent = self._check_patterns(original_query)
-        if pattern_intent:
-            return pattern_intent, 0.9
+        patterns=False skips the regex patterns, for callers that checked them with match_patterns().
+        """
+        self.ensure_trained()
         
-        # Create vector for query
-        query_vector = self.vectorizer.transform([processed_query])
+        processed_query = self._query_text(processed_tokens, original_query)
         
-        # Calculate similarities
-        similarities = cosine_similarity(query_vector, self.training_vectors)[0]
+        # One read of the current model, so a concurrent refit cannot mix two versions
+        model = self.model
         
-        # Find best match
-        best_idx = np.argmax(similarities)
-        best_score = similarities[best_idx]
-        best_intent = self.training_intents[best_idx]
+        # Check pattern matching first
+        if patterns:
+            with stage("pattern_match"):
+                pattern_intent = self._check_patterns(original_query, model)
+            if pattern_intent:
+                return pattern_intent, PATTERN_CONFIDENCE
+        
+        with stage("similarity"):
+            # Create vector for query
+            query_vector = model.vectorizer.transform([processed_query])
+            
+            # Find best match
+            best_intents, best_scores = self._score(model, query_vector, threshold)
+        best_intent, best_score = best_intents[0], best_scores[0]
         
         if best_score >= threshold:
             return best_intent, best_score
         else:
             return None, best_score
     
-    def _check_patterns(self, query):
-        """Check if query matches any regex patterns"""
-        query_lower = query.lower()
+    def predict_intents(self, queries, threshold=0.3, chunk_size=1024):
+        """Predict intents for a batch of queries, matching predict_intent row for row"""
+        processed = [self.nlp.process_query(query) for query in queries]
+        return self.predict_processed_batch(processed, threshold, chunk_size)
+    
+    def predict_processed_batch(self, processed, threshold=0.3, chunk_size=1024, patterns=True):
+        """Predict intents for (tokens, cleaned query) pairs from NLPProcessor.process_query
         
-        for intent, patterns in INTENT_PATTERNS.items():
-            for pattern in patterns:
-                if re.search(pattern, query_lower):
-                    return intent
+        patterns=False skips the regex patterns, as in predict_processed().
+        """
+        self.ensure_trained()
+        
+        model = self.model
+        intents = np.empty(len(processed), dtype=object)
+        scores = np.zeros(len(processed))
+        
+        # Check patterns once per distinct cleaned query
+        processed_queries = []
+        pattern_cache = {}
+        unmatched = []
+        with stage("pattern_match_batch"):
+            for i, (processed_tokens, original_query) in enumerate(processed):
+                if patterns and original_query not in pattern_cache:
+                    pattern_cache[original_query] = self._check_patterns(original_query, model)
+                
+                pattern_intent = pattern_cache.get(original_query)
+                if pattern_intent:
+                    intents[i], scores[i] = pattern_intent, PATTERN_CONFIDENCE
+                else:
+                    unmatched.append(i)
+                    processed_queries.append(self._query_text(processed_tokens, original_query))
+        
+        if not unmatched:
+            return intents, scores
         
-        return None
+        with stage("similarity_batch"):
+            # One transform for the whole batch, scored in chunks to bound the dense similarity block
+            query_vectors = model.vectorizer.transform(processed_queries)
+            for start in range(0, len(unmatched), chunk_size):
+                rows = unmatched[start:start + chunk_size]
+                best_intents, best_scores = self._score(model, query_vectors[start:start + chunk_size], threshold)
+                for row, best_intent, best_score in zip(rows, best_intents, best_scores):
+                    intents[row] = best_intent if best_score >= threshold else None
+                    scores[row] = best_score
+        
+        return intents, scores
+    
+    def match_patterns(self, original_query):
+        """Intent whose regex patterns match a cleaned query, or None"""
+        self.ensure_trained()
+        with stage("pattern_match"):
+            return self._check_patterns(original_query, self.model)
+    
+    def _check_patterns(self, query, model=None):
+        """Check if query matches any regex patterns"""
+        model = model or self.model
+        return model.pattern_matcher.match(query.lower())
     
     def get_training_stats(self):
         """Get statistics about training data"""
-        if not self.is_trained:
+        model = self.model
+        if model is None:
             return None
         
-        intent_counts = Counter(self.training_intents)
+        intent_counts = Counter(model.training_intents)
         return {
-            "total_examples": len(self.training_intents),
+            "total_examples": len(model.training_intents),
             "unique_intents": len(intent_counts),
             "intent_distribution": dict(intent_counts),
-            "vocabulary_size": len(self.vectorizer.vocabulary_)
+            "vocabulary_size": self._vocabulary_size(model),
+            "engine": self.engine,
+            "added_examples": len(self.extra_examples)
         }
 
+class IntentClassifier(IntentEngine):
+    """Nearest-neighbor engine: cosine similarity against the training examples or per-intent prototypes"""
+    
+    engine = 'knn'
+    
+    def __init__(self, index_mode='exhaustive', prototypes_per_intent=3, vote_k=5,
+                 vectorizer='tfidf', hash_features=2 ** 14):
+        if index_mode not in INDEX_MODES:
+            raise ValueError(f"Unknown index mode '{index_mode}', expected one of {INDEX_MODES}")
+        
+        super().__init__(vectorizer, hash_features)
+        self.index_mode = index_mode
+        self.prototypes_per_intent = prototypes_per_intent
+        self.vote_k = vote_k
+    
+    def engine_config(self):
+        return {"engine": self.engine, "index_mode": self.index_mode,
+                "prototypes_per_intent": self.prototypes_per_intent}
+    
+    def _build_index(self, training_vectors, training_intents, previous=None, changed=None):
+        """Per-intent vectors searched by the centroid and prototype modes
+        
+        With previous and changed, only the intents in changed are recomputed.
+        """
+        if self.index_mode == 'exhaustive':
+            return None, None
+        
+        labels = np.array(training_intents)
+        intent_vectors = {}
+        
+        for intent in dict.fromkeys(training_intents):
+            if previous and intent in previous and intent not in changed:
+                intent_vectors[intent] = previous[intent]
+                continue
+            
+            rows = training_vectors[np.flatnonzero(labels == intent)]
+            
+            if self.index_mode == 'centroid':
+                vectors = np.asarray(rows.mean(axis=0))
+            elif rows.shape[0] <= self.prototypes_per_intent:
+                vectors = rows.toarray()
+            else:
+                kmeans = KMeans(n_clusters=self.prototypes_per_intent, n_init=10, random_state=0)
+                vectors = kmeans.fit(rows).cluster_centers_
+            
+            # Re-normalize so a dot product against a TF-IDF row is a cosine similarity
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            intent_vectors[intent] = vectors / norms
+        
+        return intent_vectors, None
+    
+    def _similarities(self, query_vectors, vectors):
+        """Cosine similarities between L2-normalized query rows and L2-normalized rows"""
+        similarities = query_vectors @ vectors.T
+        if sparse.issparse(similarities):
+            return similarities.toarray()
+        return np.asarray(similarities)
+    
+    def _vote_nearest(self, model, similarities):
+        """Top-k nearest-neighbor vote over every training example"""
+        k = min(self.vote_k, len(similarities))
+        nearest = np.argpartition(-similarities, k - 1)[:k]
+        
+        votes = Counter()
+        best_scores = {}
+        for idx in nearest:
+            intent = model.training_intents[idx]
+            votes[intent] += 1
+            best_scores[intent] = max(best_scores.get(intent, 0.0), similarities[idx])
+        
+        # Most votes wins, ties broken by the closest neighbor
+        best_intent = max(votes, key=lambda intent: (votes[intent], best_scores[intent]))
+        return best_intent, best_scores[best_intent]
+    
+    def _score(self, model, query_vectors, threshold):
+        """Find the best intent and similarity for each row of query_vectors"""
+        if self.index_mode == 'exhaustive':
+            similarities = self._similarities(query_vectors, model.training_vectors)
+            labels = model.training_intents
+        else:
+            # Search the precomputed centroids or prototypes
+            similarities = self._similarities(query_vectors, model.index_vectors)
+            labels = model.index_intents
+        
+        best_idx = similarities.argmax(axis=1)
+        best_scores = similarities[np.arange(len(best_idx)), best_idx]
+        best_intents = [labels[idx] for idx in best_idx]
+        
+        if self.index_mode != 'exhaustive' and self.vote_k:
+            # Fall back to a top-k vote over the raw examples when the index is unsure
+            unsure = np.flatnonzero(best_scores < threshold)
+            if len(unsure):
+                example_similarities = self._similarities(query_vectors[unsure], model.training_vectors)
+                for row, similarities in zip(unsure, example_similarities):
+                    best_intents[row], best_scores[row] = self._vote_nearest(model, similarities)
+        
+        return best_intents, best_scores
+
+class LinearIntentClassifier(IntentEngine):
+    """Linear engine: multinomial logistic regression over the same TF-IDF features
+    
+    Scoring a query is one sparse product against an intents x features weight
+    matrix, so its cost does not depend on the number of training examples. The
+    score is the softmax probability of the best intent.
+    """
+    
+    engine = 'linear'
+    
+    def __init__(self, C=3.0, vectorizer='tfidf', hash_features=2 ** 14):
+        super().__init__(vectorizer, hash_features)
+        self.C = C
+    
+    def engine_config(self):
+        return {"engine": self.engine, "C": self.C}
+    
+    def _build_index(self, training_vectors, training_intents, previous=None, changed=None):
+        """One weight row and bias per intent
+        
+        Every intent's weights depend on all examples, so the whole model is refit
+        even when only some intents changed.
+        """
+        model = LogisticRegression(C=self.C, max_iter=1000)
+        model.fit(training_vectors, list(training_intents))
+        
+        coef, intercept = model.coef_, model.intercept_
+        if len(model.classes_) == 2:
+            # Binary fits return one row for the second class; the first scores zero
+            coef = np.vstack([np.zeros_like(coef), coef])
+            intercept = np.concatenate([[0.0], intercept])
+        
+        intents = [str(intent) for intent in model.classes_]
+        intent_vectors = {intent: coef[i:i + 1] for i, intent in enumerate(intents)}
+        intent_bias = {intent: float(intercept[i]) for i, intent in enumerate(intents)}
+        return intent_vectors, intent_bias
+    
+    def _score(self, model, query_vectors, threshold):
+        """Most probable intent and its probability for each row of query_vectors"""
+        logits = np.asarray(query_vectors @ model.index_vectors.T) + model.index_bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        
+        best_idx = probabilities.argmax(axis=1)
+        best_scores = probabilities[np.arange(len(best_idx)), best_idx]
+        return [model.index_intents[idx] for idx in best_idx], best_scores
+
+def create_intent_classifier(engine=None):
+    """Build the engine named by INTENT_ENGINE (default knn) with its environment settings"""
+    engine = engine or os.getenv('INTENT_ENGINE', 'knn')
+    vectorizer = os.getenv('INTENT_VECTORIZER', 'tfidf')
+    
+    if engine == 'knn':
+        return IntentClassifier(index_mode=os.getenv('INTENT_INDEX_MODE', 'exhaustive'), vectorizer=vectorizer)
+    if engine == 'linear':
+        return LinearIntentClassifier(C=float(os.getenv('INTENT_LINEAR_C', '3')), vectorizer=vectorizer)
+    if engine == 'embedding':
+        from embedding_engine import EmbeddingIntentClassifier
+        return EmbeddingIntentClassifier(
+            quantize=os.getenv('INTENT_EMBEDDING_QUANTIZE', 'float32'),
+            n_probe=int(os.getenv('INTENT_ANN_PROBES', '16'))
+        )
+    raise ValueError(f"Unknown intent engine '{engine}', expected one of {INTENT_ENGINES}")
+
 # Global classifier instance
-intent_classifier = IntentClassifier()
\ No newline at end of file
+intent_classifier = create_intent_classifier()
@@ -1,29 +1,62 @@
+import hashlib
+import os
 import re
 import nltk
 from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+from cache import LRUCache
+from nlp_resources import nlp_resources
+
+# Processing modes:
+#   nltk - punkt word_tokenize and a WordNet lookup for every token
+#   fast - one precompiled regex and a lemma table precomputed from the
+#          training and FAQ vocabulary, with WordNet only for unseen words
+NLP_MODES = ('nltk', 'fast')
+
+# Longer queries (pasted emails) are processed but not memoized
+MAX_CACHED_QUERY_LENGTH = 512
+
+# Runs of word characters; after punctuation is stripped these are exactly
+# the pieces word_tokenize sees
+WORD_RE = re.compile(r'\w+')
+
+# Single words the Treebank tokenizer behind word_tokenize splits in two
+TREEBANK_SPLITS = {
+    'cannot': ['can', 'not'],
+    'gimme': ['gim', 'me'],
+    'gonna': ['gon', 'na'],
+    'gotta': ['got', 'ta'],
+    'lemme': ['lem', 'me'],
+    'wanna': ['wan', 'na']
+}
+
+def vocabulary_words():
+    """Lowercased words from the training queries, FAQ keywords and product names"""
+    from data import FAQ_DATA, NIKE_PRODUCTS
+    from training_data import TRAINING_DATA
+    
+    texts = [example["query"] for example in TRAINING_DATA]
+    texts += [keyword for data in FAQ_DATA.values() for keyword in data['keywords']]
+    texts += list(NIKE_PRODUCTS)
+    return {word for text in texts for word in WORD_RE.findall(text.lower())}
 
 class NLPProcessor:
-    def __init__(self):
-        # Download required NLTK data
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt', quiet=True)
-        
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords', quiet=True)
+    def __init__(self, mode=None, lemma_cache_size=None, query_cache_size=None):
+        self.mode = mode or os.getenv('NLP_MODE', 'nltk')
+        if self.mode not in NLP_MODES:
+            raise ValueError(f"Unknown NLP mode '{self.mode}', expected one of {NLP_MODES}")
         
-        try:
-            nltk.data.find('corpora/wordnet')
-        except LookupError:
-            nltk.download('wordnet', quiet=True)
+        # Bounded memo caches for token -> lemma and raw query -> (tokens, cleaned query)
+        if lemma_cache_size is None:
+            lemma_cache_size = int(os.getenv('NLP_LEMMA_CACHE_SIZE', '10000'))
+        if query_cache_size is None:
+            query_cache_size = int(os.getenv('NLP_QUERY_CACHE_SIZE', '10000'))
+        self.lemma_cache = LRUCache(maxsize=lemma_cache_size)
+        self.query_cache = LRUCache(maxsize=query_cache_size)
         
-        self.lemmatizer = WordNetLemmatizer()
-        self.stop_words = set(stopwords.words('english'))
+        # Shared, already-probed NLTK resources; nothing is downloaded here
+        nlp_resources.warn_missing(self.mode)
+        self.lemmatizer = nlp_resources.lemmatizer()
+        self.stop_words = set(nlp_resources.stop_words())
         
         # Remove some words that might be important for Nike queries
         self.stop_words.discard('size')
@@ -31,6 +64,35 @@ class NLPProcessor:
         self.stop_words.discard('small')
         self.stop_words.discard('wide')
         self.stop_words.discard('narrow')
+        
+        # Lemmas for the known vocabulary, so the fast path rarely touches WordNet
+        self.lemma_table = self._build_lemma_table() if self.mode == 'fast' else {}
+        
+        # Optional spelling.SpellingCorrector applied to the cleaned text before tokenizing
+        self.corrector = None
+    
+    def set_corrector(self, corrector):
+        """Correct misspelled words from now on (None turns it off), dropping results cached without it"""
+        self.corrector = corrector
+        self.query_cache.clear()
+    
+    def resource_state(self):
+        """The NLTK data behind the processed text: missing resources, NLTK version and a stopword hash
+        
+        Text processed without punkt or WordNet (regex tokens, no lemmas) differs from
+        text processed with them, so models built from it must not be reused once they are installed.
+        """
+        stop_words = "\n".join(sorted(self.stop_words)).encode('utf-8')
+        return {
+            "missing": nlp_resources.missing(self.mode),
+            "nltk_version": nltk.__version__,
+            "stop_words": hashlib.sha256(stop_words).hexdigest()
+        }
+    
+    def _build_lemma_table(self):
+        """Precompute WordNet lemmas for every word in the training and FAQ vocabulary"""
+        words = vocabulary_words()
+        return dict(zip(words, self.lemmatize(list(words))))
     
     def tokenize(self, text):
         """Tokenize text using NLTK"""
@@ -50,19 +112,69 @@ class NLPProcessor:
     def lemmatize(self, tokens):
         """Lemmatize tokens using WordNet lemmatizer"""
         try:
-            return [self.lemmatizer.lemmatize(token) for token in tokens]
+            lemmas = []
+            for token in tokens:
+                lemma = self.lemma_cache.get(token)
+                if lemma is None:
+                    lemma = self.lemmatizer.lemmatize(token)
+                    self.lemma_cache.set(token, lemma)
+                lemmas.append(lemma)
+            return lemmas
         except:
             # Fallback - return tokens as is
             return tokens
     
+    def fast_tokenize(self, cleaned_query):
+        """Regex tokenization matching word_tokenize on punctuation-free text"""
+        tokens = []
+        for word in cleaned_query.split():
+            tokens.extend(TREEBANK_SPLITS.get(word, [word]))
+        return [token for token in tokens if token.isalpha() or token.isdigit()]
+    
+    def fast_lemmatize(self, tokens):
+        """Lemmatize from the precomputed table, asking WordNet only for unseen words"""
+        lemmas = []
+        for token in tokens:
+            lemma = self.lemma_table.get(token)
+            if lemma is None:
+                lemma = self.lemmatize([token])[0]
+            lemmas.append(lemma)
+        return lemmas
+    
     def process_query(self, query):
         """Process user query through complete NLP pipeline"""
         if not query:
             return [], ""
         
+        if len(query) > MAX_CACHED_QUERY_LENGTH:
+            return self._process_query(query)
+        
+        cached = self.query_cache.get(query)
+        if cached is None:
+            tokens, cleaned_query = self._process_query(query)
+            cached = (tuple(tokens), cleaned_query)
+            self.query_cache.set(query, cached)
+        
+        # Hand out a fresh list so callers can't change the cached tokens
+        return list(cached[0]), cached[1]
+    
+    def _process_query(self, query):
+        """Run the uncached pipeline for the configured mode"""
+        # One read, so a concurrent set_corrector cannot change it mid-query
+        corrector = self.corrector
+        if self.mode == 'fast':
+            # Joining the word runs cleans punctuation and whitespace in one pass
+            cleaned_query = " ".join(WORD_RE.findall(query)).lower()
+            if corrector is not None:
+                cleaned_query = corrector.correct(cleaned_query)
+            tokens = self.remove_stopwords(self.fast_tokenize(cleaned_query))
+            return self.fast_lemmatize(tokens), cleaned_query
+        
         # Clean the query
         query = re.sub(r'[^\w\s]', ' ', query)  # Remove punctuation
         query = re.sub(r'\s+', ' ', query).strip()  # Normalize whitespace
+        if corrector is not None:
+            query = corrector.correct(query.lower())  # Fix misspelled words
         
         # Tokenize
         tokens = self.tokenize(query)
@@ -73,4 +185,11 @@ class NLPProcessor:
         # Lemmatize
         tokens = self.lemmatize(tokens)
         
-        return tokens, query.lower()
\ No newline at end of file
+        return tokens, query.lower()
+    
+    def cache_stats(self):
+        """Hit-rate stats for the lemma and query memo caches"""
+        return {
+            "lemmas": self.lemma_cache.stats(),
+            "queries": self.query_cache.stats()
+        }
\ No newline at end of file
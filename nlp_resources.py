@@ -0,0 +1,107 @@
+"""
+Process-wide NLTK resources for Nike Customer Support Chatbot
+Checks for NLTK data once per process, never downloads at runtime, and
+loads everything eagerly through warmup() before the app starts serving
+"""
+
+import threading
+import time
+import nltk
+from nltk.corpus import stopwords, wordnet
+from nltk.stem import WordNetLemmatizer
+from nltk.tokenize import word_tokenize
+
+# NLTK data each processing mode needs, as (name, nltk.data path)
+REQUIRED_RESOURCES = {
+    'nltk': [('punkt', 'tokenizers/punkt'), ('stopwords', 'corpora/stopwords'), ('wordnet', 'corpora/wordnet')],
+    'fast': [('stopwords', 'corpora/stopwords'), ('wordnet', 'corpora/wordnet')]
+}
+
+class NLPResourceError(LookupError):
+    """Raised when NLTK data is missing; run setup.py to install it"""
+
+class NLPResources:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._found = {}
+        self._stop_words = None
+        self._lemmatizer = None
+        self.warm = False
+        self._warned = set()
+    
+    def _is_installed(self, path):
+        """Look a resource up once; the answer is cached for the process"""
+        if path not in self._found:
+            try:
+                nltk.data.find(path)
+                self._found[path] = True
+            except LookupError:
+                self._found[path] = False
+        return self._found[path]
+    
+    def missing(self, mode='nltk'):
+        """Names of NLTK resources the given mode needs that are not installed"""
+        with self._lock:
+            return [name for name, path in REQUIRED_RESOURCES[mode] if not self._is_installed(path)]
+    
+    def warn_missing(self, mode='nltk'):
+        """Print one warning per mode for missing resources; returns the missing names"""
+        missing = self.missing(mode)
+        if missing and mode not in self._warned:
+            self._warned.add(mode)
+            print(f"⚠ Missing NLTK data: {', '.join(missing)} - run `python setup.py`; NLP will run degraded")
+        return missing
+    
+    def require(self, mode='nltk'):
+        """Fail fast if any needed resource is missing, instead of downloading it"""
+        missing = self.missing(mode)
+        if missing:
+            raise NLPResourceError(
+                f"Missing NLTK data: {', '.join(missing)}. "
+                "Run `python setup.py` (or nltk.download) while online; no downloads are attempted at runtime."
+            )
+    
+    def stop_words(self):
+        """Shared English stopword set (do not modify; copy it first)"""
+        with self._lock:
+            if self._stop_words is None:
+                self._stop_words = frozenset(stopwords.words('english'))
+            return self._stop_words
+    
+    def lemmatizer(self):
+        """Shared WordNet lemmatizer"""
+        with self._lock:
+            if self._lemmatizer is None:
+                self._lemmatizer = WordNetLemmatizer()
+            return self._lemmatizer
+    
+    def is_dictionary_word(self, word):
+        """True if WordNet lists word itself as a lemma; False when WordNet is not installed"""
+        # A missing corpus would otherwise be searched for again on every call
+        with self._lock:
+            installed = self._is_installed('corpora/wordnet')
+        return installed and bool(wordnet.lemmas(word))
+    
+    def warmup(self, mode='nltk', strict=True):
+        """Load every resource the mode uses now, so no request pays for it; returns seconds spent"""
+        start = time.perf_counter()
+        if strict:
+            self.require(mode)
+        else:
+            self.warn_missing(mode)
+        
+        self.stop_words()
+        try:
+            # WordNet loads lazily on the first lemmatize call
+            self.lemmatizer().lemmatize('sneakers')
+            if mode == 'nltk':
+                word_tokenize("warm up the tokenizer")
+        except LookupError:
+            if strict:
+                raise
+        
+        self.warm = True
+        return time.perf_counter() - start
+
+# Global resources shared by every NLPProcessor in the process
+nlp_resources = NLPResources()
@@ -0,0 +1,172 @@
+"""
+Thread-pooled OpenAI client for Nike Customer Support Chatbot
+Runs fallback completions off the request thread with a per-call deadline
+and coalesces identical in-flight questions into one upstream call; batch
+calls run on their own smaller pool, so a large batch cannot starve chat turns
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+
+_STREAM_END = object()
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "You are a knowledgeable Nike sneaker store assistant. Provide helpful, accurate information about Nike products, sizing, shipping, returns, and general customer service. Keep responses under 150 words and be friendly and professional."
+
+class OpenAIFallbackClient:
+    def __init__(self, api_key, model="gpt-3.5-turbo", timeout=8.0, max_workers=8, api_base=None,
+                 max_batch_workers=4):
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.api_base = api_base or openai.api_base
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="openai")
+        # ask_many() calls queue here, capping how many batch questions go upstream at once
+        self.batch_executor = ThreadPoolExecutor(max_workers=max_batch_workers, thread_name_prefix="openai-batch")
+        
+        # One keep-alive connection pool shared by every worker thread
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers + max_batch_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        openai.requestssession = self.session
+        
+        # Normalized query -> future of the upstream call answering it
+        self._in_flight = {}
+        self._lock = threading.RLock()
+    
+    def _messages(self, query):
+        """Chat messages sent for a customer question"""
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": query}
+        ]
+    
+    def _complete(self, query):
+        """Blocking completion call, run on a worker thread"""
+        response = openai.ChatCompletion.create(
+            model=self.model,
+            messages=self._messages(query),
+            max_tokens=150,
+            temperature=0.7,
+            api_key=self.api_key,
+            api_base=self.api_base,
+            request_timeout=self.timeout
+        )
+        return response.choices[0].message.content.strip()
+    
+    def submit(self, query):
+        """Start a completion, or join the identical one already in flight"""
+        return self._submit(query, self.executor)[0]
+    
+    def _submit(self, query, executor):
+        """(future, whether this call started it) for query, run on executor unless joined"""
+        key = " ".join(query.lower().split())
+        with self._lock:
+            future = self._in_flight.get(key)
+            # A batch call still queued may wait minutes or be cancelled, so chat turns do not join it
+            if future is not None and not (executor is self.batch_executor or future.running() or future.done()):
+                future = None
+            if future is not None:
+                return future, False
+            future = executor.submit(self._complete, query)
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done, key=key: self._forget(key, done))
+        return future, True
+    
+    def _forget(self, key, future):
+        """Drop a finished call so later questions hit the API again"""
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+    
+    def ask(self, query, deadline=None):
+        """Answer text, or None if the call fails or misses the deadline"""
+        deadline = self.timeout if deadline is None else deadline
+        future = self.submit(query)
+        try:
+            return future.result(timeout=deadline)
+        except FutureTimeoutError:
+            logger.warning("OpenAI API Error: no answer within %gs", deadline)
+        except Exception as e:
+            logger.warning("OpenAI API Error: %s", e)
+        return None
+    
+    def ask_many(self, queries, deadline=None):
+        """Answers for several questions asked concurrently, None where a call failed or ran out of time"""
+        deadline = self.timeout if deadline is None else deadline
+        submitted = [self._submit(query, self.batch_executor) for query in queries]
+        end = time.monotonic() + deadline
+        
+        answers = []
+        timed_out = 0
+        errors = []
+        for future, _ in submitted:
+            try:
+                answers.append(future.result(timeout=max(end - time.monotonic(), 0)))
+            except (FutureTimeoutError, CancelledError):
+                timed_out += 1
+                answers.append(None)
+            except Exception as e:
+                errors.append(e)
+                answers.append(None)
+        
+        # Calls that never started would only hold up later questions
+        cancelled = sum(future.cancel() for future, started in submitted if started and not future.done())
+        if timed_out or errors:
+            logger.warning(
+                "OpenAI API Error: %d of %d batch questions unanswered (%d past the %gs deadline, "
+                "%d not yet sent and cancelled, %d failed%s)",
+                timed_out + len(errors), len(queries), timed_out, deadline, cancelled, len(errors),
+                f", first: {errors[0]}" if errors else ""
+            )
+        return answers
+    
+    def stream(self, query, deadline=None):
+        """Yield answer chunks as they arrive, raising TimeoutError if the stream stalls past the deadline"""
+        deadline = self.timeout if deadline is None else deadline
+        chunks = queue.Queue()
+        
+        def produce():
+            try:
+                for event in openai.ChatCompletion.create(
+                    model=self.model,
+                    messages=self._messages(query),
+                    max_tokens=150,
+                    temperature=0.7,
+                    api_key=self.api_key,
+                    api_base=self.api_base,
+                    request_timeout=self.timeout,
+                    stream=True
+                ):
+                    content = event.choices[0].delta.get("content")
+                    if content:
+                        chunks.put(content)
+                chunks.put(_STREAM_END)
+            except Exception as e:
+                chunks.put(e)
+        
+        self.executor.submit(produce)
+        while True:
+            try:
+                chunk = chunks.get(timeout=deadline)
+            except queue.Empty:
+                raise TimeoutError(f"no answer within {deadline:g}s")
+            
+            if chunk is _STREAM_END:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    
+    def in_flight(self):
+        """Number of distinct upstream calls currently running"""
+        with self._lock:
+            return len(self._in_flight)
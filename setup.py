@@ -26,6 +26,16 @@ def setup_nltk():
     except Exception as e:
         print(f"⚠ NLTK setup failed: {e}")
 
+def build_intent_model():
+    """Train the intent classifier once and save it for workers to load"""
+    print("Building intent classifier model...")
+    try:
+        from ml_trainer import intent_classifier
+        intent_classifier.load_or_train()
+        print("✓ Intent classifier model ready")
+    except Exception as e:
+        print(f"⚠ Intent classifier build failed: {e}")
+
 def create_env_file():
     """Create .env file template"""
     env_content = """# Nike Customer Support Chatbot Environment Variables
@@ -53,6 +63,9 @@ def main():
     # Setup NLTK
     setup_nltk()
     
+    # Prebuild the intent classifier artifact
+    build_intent_model()
+    
     # Create environment file
     create_env_file()
     
@@ -0,0 +1,124 @@
+"""
+Symmetric-delete spelling correction for Nike Customer Support Chatbot
+Every deletion of every known word is precomputed, so a misspelled word is
+corrected by looking up its own deletions instead of scanning the vocabulary
+with an edit-distance comparison
+"""
+
+import re
+from collections import Counter
+
+# Largest edit distance a correction may span
+MAX_EDIT_DISTANCE = 2
+
+# Shorter words are never corrected; 'hi' and 'ok' are one edit from too much
+MIN_CORRECTION_LENGTH = 4
+
+# Words shorter than this may be one edit away from their correction, longer ones two
+TWO_EDIT_LENGTH = 8
+
+WORD_RE = re.compile(r'[a-z]+')
+
+def deletes(word, distance):
+    """Every string reachable from word by deleting up to distance characters"""
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+def edit_distance(a, b, max_distance):
+    """Optimal string alignment distance (adjacent transpositions count once), or max_distance + 1 if larger"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    # Typos are local, so the shared prefix and suffix usually leave only a few characters to align
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        return min(len(a) + len(b), max_distance + 1)
+
+    previous_row = None
+    row = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        previous_row, row = row, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], before_previous[j - 2] + 1)
+        if min(row) > max_distance:
+            return max_distance + 1
+        before_previous = previous_row
+    return min(row[-1], max_distance + 1)
+
+class SpellingCorrector:
+    """Corrects unknown words to the most frequent known word within a small edit distance; never modified in place"""
+
+    def __init__(self, words, protected=(), is_word=None, max_edit_distance=MAX_EDIT_DISTANCE):
+        # Left as they are, but never offered as a correction (stopwords)
+        protected = set(protected)
+        # Occurrence counts break ties between equally close corrections
+        self.frequencies = Counter(word for word in words if word.isalpha() and word not in protected)
+        self.known = set(self.frequencies) | protected
+        # Optional dictionary check for words outside the vocabulary, so 'weather' never becomes 'leather'
+        self.is_word = is_word
+        self.max_edit_distance = max_edit_distance
+
+        # Deletion -> vocabulary words it was derived from
+        self.index = {}
+        for word in self.frequencies:
+            for deletion in deletes(word, max_edit_distance):
+                self.index.setdefault(deletion, []).append(word)
+
+    def __len__(self):
+        return len(self.frequencies)
+
+    def correct_word(self, word):
+        """The closest vocabulary word with the same first letter, or word itself when it is known, short or has no close match"""
+        if word in self.known or len(word) < MIN_CORRECTION_LENGTH or not word.isalpha():
+            return word
+
+        distance = min(self.max_edit_distance, 1 if len(word) < TWO_EDIT_LENGTH else 2)
+        candidates = {candidate for deletion in deletes(word, distance) for candidate in self.index.get(deletion, ())}
+
+        best_key = None
+        best_word = word
+        for candidate in candidates:
+            # Typos rarely hit the first letter; real words that do ('last' -> 'fast') are left alone
+            if candidate[0] != word[0]:
+                continue
+            candidate_distance = edit_distance(word, candidate, distance)
+            if candidate_distance > distance:
+                continue
+
+            # Closest first, then most frequent, then alphabetical so the answer is stable
+            key = (candidate_distance, -self.frequencies[candidate], candidate)
+            if best_key is None or key < best_key:
+                best_key = key
+                best_word = candidate
+
+        # Only consulted when a correction is on the table, to keep lookups rare
+        if best_key is not None and self.is_word is not None and self.is_word(word):
+            return word
+        return best_word
+
+    def correct(self, text):
+        """Correct every lowercase word in text, leaving everything else untouched"""
+        return WORD_RE.sub(lambda match: self.correct_word(match.group()), text)
+
+def build_spelling_corrector(knowledge, vocabulary=(), protected=(), is_word=None):
+    """Corrector for a knowledge base's FAQ keywords, product names and aliases and
+    training queries, plus extra vocabulary such as a fitted TF-IDF vocabulary"""
+    texts = [keyword for data in knowledge.faq_data.values() for keyword in data['keywords']]
+    texts += list(knowledge.products) + list(knowledge.product_aliases)
+    texts += [example["query"] for example in knowledge.training_data]
+    texts += list(vocabulary)
+    words = [word for text in texts for word in WORD_RE.findall(text.lower())]
+    return SpellingCorrector(words, protected=protected, is_word=is_word)
@@ -0,0 +1,61 @@
+// Auto-scroll to bottom of chat
+function scrollToBottom() {
+    const chatContainer = document.getElementById('chatContainer');
+    chatContainer.scrollTop = chatContainer.scrollHeight;
+}
+
+// Focus on input field
+document.getElementById('messageInput').focus();
+
+// Scroll to bottom on page load
+scrollToBottom();
+
+// Add a message bubble to the chat
+function appendMessage(className, text) {
+    const chatContainer = document.getElementById('chatContainer');
+    const welcome = chatContainer.querySelector('.welcome-message');
+    if (welcome) {
+        welcome.remove();
+    }
+    
+    const message = document.createElement('div');
+    message.className = 'message streamed-message ' + className;
+    message.textContent = text;
+    chatContainer.appendChild(message);
+    scrollToBottom();
+    return message;
+}
+
+// Handle form submission - stream the reply, or post the form if streaming is unavailable
+const chatForm = document.getElementById('chatForm');
+chatForm.addEventListener('submit', function(event) {
+    const input = document.getElementById('messageInput');
+    const userMessage = input.value.trim();
+    if (!window.EventSource || !userMessage) {
+        setTimeout(scrollToBottom, 100);
+        return;
+    }
+    event.preventDefault();
+    
+    appendMessage('user-message', userMessage);
+    const botMessage = appendMessage('bot-message', '');
+    input.value = '';
+    
+    let received = false;
+    const source = new EventSource('/chat/stream?message=' + encodeURIComponent(userMessage));
+    source.onmessage = function(e) {
+        received = true;
+        botMessage.textContent += JSON.parse(e.data).text;
+        scrollToBottom();
+    };
+    source.addEventListener('done', function() {
+        source.close();
+    });
+    source.onerror = function() {
+        source.close();
+        if (!received) {
+            input.value = userMessage;
+            chatForm.submit();
+        }
+    };
+});